@@ -3,9 +3,10 @@
 from flask import Flask
 from app.core import mail, csrf
 from app.models import db, Article, User, Newsletter, CustomPage
+from app.utils.markdown_renderer import render_markdown, markdown_cache, DEFAULT_CACHE_MAX_BYTES
+from app.utils.lazy import LazyList
+from app.utils.images import image_url, image_srcset
 from config import cfg
-import markdown
-from markupsafe import Markup
 
 
 def create_app():
@@ -29,20 +30,31 @@ def create_app():
     # Initialize SQLAlchemy
     db.init_app(app)
     
+    # WAL, busy timeout and cache pragmas on every SQLite connection
+    from app.core.sqlite_pragmas import init_sqlite_pragmas
+    init_sqlite_pragmas(app, db)
+    
     # Initialize Flask-Mail
     mail.init_app(app)
     
     # Initialize CSRF Protection
     csrf.init_app(app)
     
-    # Note: Using threading for background emails instead of Celery/Redis
+    # Note: Using a bounded thread pool for background emails instead of Celery/Redis
     # See app/core/tasks.py for send_welcome_email_background() and send_article_notification_background()
     
-    # Add markdown filter for templates
+    # Size the shared markdown cache from config
+    markdown_cache.configure(app.config.get('MARKDOWN_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+    
+    # Add markdown filter for templates (results are cached per process)
     @app.template_filter('markdown')
     def markdown_filter(text):
         """Convert markdown to HTML."""
-        return Markup(markdown.markdown(text, extensions=['fenced_code', 'tables', 'nl2br']))
+        return render_markdown(text)
+    
+    # Pick resized copies of uploads (profile pictures, backgrounds, logo, favicon)
+    app.add_template_global(image_url)
+    app.add_template_global(image_srcset)
     
     # Create tables if needed
     with app.app_context():
@@ -59,6 +71,18 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(profile_bp)
     
+    # Opt-in full-page cache for anonymous visitors (RESPONSE_CACHE_ENABLED)
+    from app.core.response_cache import init_response_cache
+    init_response_cache(app)
+    
+    # Fingerprinted static URLs (?v=<hash>) served with immutable caching
+    from app.core.static_assets import init_static_assets
+    init_static_assets(app)
+    
+    # Register maintenance CLI commands (flask backfill-article-html, ...)
+    from app.core.commands import register_commands
+    register_commands(app)
+    
     # Register context processor for site settings
     from app.models import SiteSettings
     
@@ -68,23 +92,24 @@ def create_app():
         def get_settings_wrapper():
             """Wrapper to safely get settings with error handling."""
             try:
-                return SiteSettings.get_settings()
+                return SiteSettings.get_cached()
             except Exception as e:
                 # Return default settings if database error
                 app.logger.error(f"Error loading site settings: {e}")
                 return SiteSettings()
         
         def get_custom_pages():
-            """Get all published custom pages for navigation."""
+            """Get nav links for published custom pages shown in navigation."""
             try:
-                return CustomPage.query.filter_by(is_published=True).all()
+                return CustomPage.nav_links()
             except Exception as e:
                 app.logger.error(f"Error loading custom pages: {e}")
                 return []
         
         return {
             'get_site_settings': get_settings_wrapper,
-            'custom_pages': get_custom_pages()
+            # Only queried if the template actually draws the nav
+            'custom_pages': LazyList(get_custom_pages)
         }
     
     # Register error handlers
@@ -0,0 +1,74 @@
+"""
+Article listing for the admin dashboard.
+
+The dashboard reads a column projection (no content, no rendered HTML,
+author name from an outer join) one keyset page at a time, so its cost
+does not grow with the number of articles. Filters narrow the same query:
+status, author username and a title prefix.
+"""
+
+from app.models import db, Article, User
+from app.utils.pagination import keyset_paginate
+
+DEFAULT_PER_PAGE = 50
+
+# Values accepted for the status filter
+STATUSES = {
+    'published': 1,
+    'draft': 0,
+}
+
+
+def _escape_like(value, escape='\\'):
+    """Escape LIKE wildcards so `value` only ever matches literally."""
+    return value.replace(escape, escape * 2).replace('%', escape + '%').replace('_', escape + '_')
+
+
+def admin_articles_query(status=None, author=None, title_prefix=None):
+    """
+    Projection of the columns the dashboard renders, filtered.
+
+    Args:
+        status: 'published' or 'draft'; anything else lists both
+        author: Exact username of the author
+        title_prefix: Only titles starting with this (case-insensitive for ASCII)
+
+    Returns:
+        Query yielding rows with id, slug, title, summary, published,
+        created_at, author_username and author_display_name
+    """
+    query = (db.session.query(
+                Article.id, Article.slug, Article.title, Article.summary,
+                Article.published, Article.created_at,
+                User.username.label('author_username'),
+                User.display_name.label('author_display_name'))
+             .outerjoin(User, User.id == Article.author_id))
+    if status in STATUSES:
+        query = query.filter(Article.published == STATUSES[status])
+    if author:
+        # By id, so the (author_id, created_at, id) index drives the page
+        author_id = db.session.query(User.id).filter(User.username == author).scalar_subquery()
+        query = query.filter(Article.author_id == author_id)
+    if title_prefix:
+        query = query.filter(Article.title.like(_escape_like(title_prefix) + '%', escape='\\'))
+    return query
+
+
+def admin_articles_page(status=None, author=None, title_prefix=None,
+                        per_page=DEFAULT_PER_PAGE, after=None, before=None):
+    """
+    One keyset page of admin_articles_query(), newest first.
+
+    `after` / `before` are decoded cursors as for the public listing.
+
+    Returns:
+        KeysetPage
+    """
+    return keyset_paginate(
+        admin_articles_query(status, author, title_prefix),
+        Article.created_at,
+        Article.id,
+        per_page,
+        after=after,
+        before=before,
+    )
@@ -0,0 +1,99 @@
+"""Flask CLI commands for database maintenance, upload cleanup and the email outbox worker."""
+
+import signal
+
+import click
+from flask.cli import with_appcontext
+from app.models import db, Article, UploadBlob
+from app.utils.markdown_renderer import content_hash
+
+
+@click.command('backfill-article-html')
+@click.option('--batch-size', default=200, show_default=True, help='Articles processed per transaction.')
+@click.option('--force', is_flag=True, help='Re-render every article, even if its stored HTML is current.')
+@with_appcontext
+def backfill_article_html(batch_size, force):
+    """Pre-render markdown for articles with missing or stale HTML."""
+    last_id = 0
+    rendered = 0
+    
+    while True:
+        batch = (Article.query
+                 .filter(Article.id > last_id)
+                 .order_by(Article.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        
+        for article in batch:
+            if force or article.content_html is None or article.content_hash != content_hash(article.content):
+                article.render_content()
+                rendered += 1
+        
+        last_id = batch[-1].id
+        db.session.commit()
+        # Keep memory flat on large tables
+        db.session.expunge_all()
+    
+    click.echo(f'Rendered {rendered} article(s).')
+
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters():
+    """Recompute article like and approved comment counters from source rows."""
+    repaired = Article.reconcile_counters()
+    db.session.commit()
+    click.echo(f'Repaired counters on {repaired} article(s).')
+
+
+@click.command('gc-uploads')
+@click.option('--grace-seconds', type=int, default=None,
+              help='Keep blobs unreferenced for less than this (default: UPLOAD_GC_GRACE_SECONDS).')
+@with_appcontext
+def gc_uploads(grace_seconds):
+    """Recount upload references, then delete uploads nothing references."""
+    from app.core.uploads import collect_garbage
+    
+    repaired = UploadBlob.reconcile_refcounts()
+    db.session.commit()
+    removed = 0
+    while True:
+        collected = collect_garbage(grace_seconds=grace_seconds)
+        removed += collected
+        if not collected:
+            break
+    click.echo(f'Repaired {repaired} refcount(s); removed {removed} unreferenced upload(s).')
+
+
+@click.command('email-worker')
+@click.option('--batch-size', type=int, default=None, help='Jobs claimed per batch (default: EMAIL_OUTBOX_BATCH_SIZE).')
+@click.option('--poll-interval', type=float, default=None, help='Seconds to sleep when no jobs are due (default: EMAIL_OUTBOX_POLL_INTERVAL).')
+@click.option('--once', is_flag=True, help='Exit once no due jobs are left instead of polling.')
+@with_appcontext
+def email_worker(batch_size, poll_interval, once):
+    """Send emails recorded in the outbox until stopped (SIGTERM/Ctrl+C)."""
+    from app.core.outbox import run_worker
+    
+    stopping = []
+    
+    def request_stop(signum, frame):
+        # Finish the current batch, then exit
+        stopping.append(signum)
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    totals = run_worker(batch_size=batch_size, poll_interval=poll_interval, once=once,
+                        should_stop=lambda: bool(stopping))
+    click.echo(f"Sent {totals['sent']} email(s); {totals['retried']} to retry, {totals['failed']} failed; "
+               f"expanded {totals['expanded']} newsletter fan-out(s), pruned {totals['pruned']} old job(s).")
+
+
+def register_commands(app):
+    """Attach maintenance commands to the app's CLI."""
+    app.cli.add_command(backfill_article_html)
+    app.cli.add_command(reconcile_counters)
+    app.cli.add_command(gc_uploads)
+    app.cli.add_command(email_worker)
@@ -0,0 +1,263 @@
+"""
+Newsletter emails rendered once per send and pre-encoded.
+
+The Jinja templates under templates/email/ are rendered a single time with
+placeholders for the per-recipient fields, then encoded to MIME bytes.
+Building each recipient's message is a few bytes.replace() calls for the
+To header, Message-ID and unsubscribe link, instead of a template render,
+a url_for() call and a MIME encode per subscriber.
+
+Each email is compiled twice. The 8bit copy is sent with BODY=8BITMIME
+when the server advertises 8BITMIME (see send_message()). Its lines are
+wrapped at whitespace before encoding, to stay within SMTP's 998-octet line
+limit. The quoted-printable copy is used otherwise, and for recipients whose
+unsubscribe link would overflow an 8bit line. In it, the unsubscribe
+placeholder sits on a line of its own, so it is substituted after encoding.
+"""
+
+from email import policy, quoprimime
+from email.charset import Charset
+from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate
+from urllib.parse import urlencode
+
+from flask import current_app, render_template, url_for
+from flask_mail import Message, sanitize_address, sanitize_subject
+
+RECIPIENT_PLACEHOLDER = 'recipient@placeholder.invalid'
+MESSAGE_ID_PLACEHOLDER = '<message-id@placeholder.invalid>'
+UNSUBSCRIBE_PLACEHOLDER = '__UNSUBSCRIBE_URL__'
+
+# Bodies go out as 8bit UTF-8 (not base64) so placeholders survive encoding verbatim
+_UTF8_8BIT = Charset('utf-8')
+_UTF8_8BIT.body_encoding = None
+
+# SMTP's hard limit per line, without CRLF (RFC 5321), and the wrap width
+# recommended by RFC 5322
+MAX_LINE_OCTETS = 998
+WRAP_OCTETS = 78
+
+
+def _octets(text):
+    return len(text.encode('utf-8'))
+
+
+def _split_line(line):
+    """Split one over-long line in two, at whitespace where possible."""
+    fits = len(line.encode('utf-8')[:WRAP_OCTETS + 1].decode('utf-8', 'ignore'))
+    indent = len(line) - len(line.lstrip(' '))
+    cut = line.rfind(' ', indent + 1, fits)
+    if cut == -1:
+        cut = line.find(' ', max(fits, indent + 1))
+    if cut == -1 or _octets(line[:cut]) > MAX_LINE_OCTETS:
+        # No usable whitespace: hard cut below the limit, never inside a placeholder
+        cut = len(line.encode('utf-8')[:MAX_LINE_OCTETS].decode('utf-8', 'ignore'))
+        start = line.rfind(UNSUBSCRIBE_PLACEHOLDER, 0, cut)
+        if start > 0 and start + len(UNSUBSCRIBE_PLACEHOLDER) > cut:
+            cut = start
+        return line[:cut], line[cut:]
+    return line[:cut], line[cut + 1:]
+
+
+def wrap_body(body):
+    """Wrap lines longer than WRAP_OCTETS at whitespace so no line can exceed SMTP's limit."""
+    lines = []
+    for line in body.split('\n'):
+        while _octets(line) > WRAP_OCTETS:
+            head, line = _split_line(line)
+            lines.append(head)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def qp_body(body):
+    """
+    Quoted-printable encode a UTF-8 body, keeping each unsubscribe
+    placeholder verbatim between soft line breaks.
+    """
+    lines = []
+    for line in body.split('\n'):
+        pieces = line.split(UNSUBSCRIBE_PLACEHOLDER)
+        encoded = _qp_encode(pieces[0])
+        for piece in pieces[1:]:
+            encoded += ('=\n' if encoded else '') + UNSUBSCRIBE_PLACEHOLDER
+            if piece:
+                encoded += '=\n' + _qp_encode(piece)
+        lines.append(encoded)
+    return '\n'.join(lines)
+
+
+def _qp_encode(text):
+    return quoprimime.body_encode(text.encode('utf-8').decode('latin-1')) if text else ''
+
+
+def _qp_url(url, width=75):
+    """An ASCII URL as quoted-printable, soft-wrapped to fit QP's 76-character lines."""
+    lines = ['']
+    for char in url:
+        token = '=3D' if char == '=' else char
+        if len(lines[-1]) + len(token) > width:
+            lines.append('')
+        lines[-1] += token
+    return '=\r\n'.join(lines)
+
+
+def supports_8bitmime(conn):
+    """True if the SMTP server behind a Flask-Mail connection accepts 8bit bodies."""
+    if conn.host is None:
+        return True  # Sending is suppressed (tests, MAIL_SUPPRESS_SEND)
+    conn.host.ehlo_or_helo_if_needed()
+    return conn.host.has_extn('8bitmime')
+
+
+def send_message(conn, message):
+    """
+    conn.send() a message. A PreencodedMessage goes out as 8bit, with
+    BODY=8BITMIME, if the server supports it, else as quoted-printable.
+    """
+    if isinstance(message, PreencodedMessage):
+        message.use_8bitmime(supports_8bitmime(conn))
+    conn.send(message)
+
+
+class PreencodedMessage(Message):
+    """A Flask-Mail Message whose MIME bytes were produced up front."""
+
+    def __init__(self, raw_8bit, raw_qp, **kwargs):
+        super().__init__(**kwargs)
+        message_id = self.msgId.encode('ascii')
+        placeholder = MESSAGE_ID_PLACEHOLDER.encode('ascii')
+        self.raw_8bit = raw_8bit.replace(placeholder, message_id) if raw_8bit is not None else None
+        self.raw_qp = raw_qp.replace(placeholder, message_id)
+        self.use_8bitmime(False)
+
+    def use_8bitmime(self, supported):
+        """Pick the 8bit copy (announced with BODY=8BITMIME) if the server supports it and there is one."""
+        eight_bit = supported and self.raw_8bit is not None
+        self.raw = self.raw_8bit if eight_bit else self.raw_qp
+        self.mail_options = ['BODY=8BITMIME'] if eight_bit else []
+
+    def as_bytes(self):
+        return self.raw
+
+    def as_string(self):
+        return self.raw.decode('utf-8')
+
+
+class CompiledEmail:
+    """An email rendered and encoded once, stamped out per recipient."""
+
+    def __init__(self, subject, text, html, unsubscribe_base_url, sender=None):
+        self.subject = subject
+        self.sender = sender or current_app.extensions['mail'].default_sender
+        self.unsubscribe_base_url = unsubscribe_base_url
+
+        date = formatdate(localtime=True)
+        self.raw = self._compile(text, html, date, eight_bit=True)
+        self.raw_qp = self._compile(text, html, date, eight_bit=False)
+        self.max_unsubscribe_url = self._unsubscribe_url_budget(self.raw)
+
+    def _compile(self, text, html, date, eight_bit):
+        """MIME bytes with placeholders, as 8bit or quoted-printable."""
+        # Same layout Flask-Mail builds: mixed > alternative > (plain, html)
+        msg = MIMEMultipart()
+        alternative = MIMEMultipart('alternative')
+        for body, subtype in ((text, 'plain'), (html, 'html')):
+            if eight_bit:
+                part = MIMEText(wrap_body(body), subtype, _UTF8_8BIT)
+            else:
+                part = MIMENonMultipart('text', subtype, charset='utf-8')
+                part['Content-Transfer-Encoding'] = 'quoted-printable'
+                part.set_payload(qp_body(body))
+            alternative.attach(part)
+        msg.attach(alternative)
+        msg['Subject'] = sanitize_subject(self.subject, 'utf-8')
+        msg['From'] = sanitize_address(self.sender, 'utf-8')
+        msg['To'] = RECIPIENT_PLACEHOLDER
+        msg['Date'] = date
+        msg['Message-ID'] = MESSAGE_ID_PLACEHOLDER
+        msg.policy = policy.SMTP
+        return msg.as_bytes()
+
+    @staticmethod
+    def _unsubscribe_url_budget(raw):
+        """Longest unsubscribe URL that keeps every line within MAX_LINE_OCTETS."""
+        placeholder = UNSUBSCRIBE_PLACEHOLDER.encode('ascii')
+        budget = MAX_LINE_OCTETS
+        for line in raw.split(b'\r\n'):
+            count = line.count(placeholder)
+            if count:
+                budget = min(budget, (MAX_LINE_OCTETS - len(line) + count * len(placeholder)) // count)
+        return budget
+
+    @classmethod
+    def from_templates(cls, subject, template, unsubscribe_base_url, **context):
+        """Render email/<template>.txt.jinja and .html.jinja once with placeholders."""
+        context['unsubscribe_url'] = UNSUBSCRIBE_PLACEHOLDER
+        text = render_template(f'email/{template}.txt.jinja', **context)
+        html = render_template(f'email/{template}.html.jinja', **context)
+        return cls(subject, text, html, unsubscribe_base_url)
+
+    def unsubscribe_url(self, recipient):
+        return f"{self.unsubscribe_base_url}?{urlencode({'email': recipient})}"
+
+    def message_for(self, recipient):
+        """
+        Return a ready-to-send Message for one recipient; send it with
+        send_message() so the encoding matches the server.
+
+        Raises:
+            ValueError: If the address cannot be encoded (UnicodeError is a
+            ValueError). This is permanent; sending to the same address
+            again cannot succeed.
+        """
+        to = sanitize_address(recipient, 'utf-8').encode('utf-8')
+        unsubscribe_url = self.unsubscribe_url(recipient)
+        placeholder = UNSUBSCRIBE_PLACEHOLDER.encode('ascii')
+        raw_qp = (self.raw_qp
+                  .replace(RECIPIENT_PLACEHOLDER.encode('ascii'), to)
+                  .replace(placeholder, _qp_url(unsubscribe_url).encode('ascii')))
+        raw_8bit = None
+        # A link too long for an 8bit line only goes out quoted-printable
+        if len(unsubscribe_url) <= self.max_unsubscribe_url:
+            raw_8bit = (self.raw
+                        .replace(RECIPIENT_PLACEHOLDER.encode('ascii'), to)
+                        .replace(placeholder, unsubscribe_url.encode('ascii')))
+        return PreencodedMessage(raw_8bit, raw_qp, subject=self.subject, recipients=[recipient], sender=self.sender)
+
+
+def site_urls():
+    """Absolute home, articles and unsubscribe URLs (with a fallback outside requests)."""
+    try:
+        return {
+            'home_url': url_for('public.index', _external=True),
+            'articles_url': url_for('public.articles', _external=True),
+            'unsubscribe_base_url': url_for('public.newsletter_unsubscribe', _external=True),
+        }
+    except Exception:
+        return {
+            'home_url': 'https://yourblog.com/',
+            'articles_url': 'https://yourblog.com/articles/',
+            'unsubscribe_base_url': 'https://yourblog.com/newsletter/unsubscribe',
+        }
+
+
+def compile_welcome_email():
+    """Compile the newsletter welcome email."""
+    urls = site_urls()
+    return CompiledEmail.from_templates(
+        "🎉 Welcome to Sealy's Flask Blog!", 'welcome', urls.pop('unsubscribe_base_url'), **urls)
+
+
+def compile_article_notification(article):
+    """Compile the new-article notification for `article`."""
+    urls = site_urls()
+    try:
+        urls['article_url'] = url_for('public.article_detail', slug=article.slug, _external=True)
+    except Exception:
+        urls['article_url'] = f'https://yourblog.com/articles/{article.slug}'
+    return CompiledEmail.from_templates(
+        f'📝 New Article: {article.title}', 'article_notification', urls.pop('unsubscribe_base_url'),
+        article=article, **urls)
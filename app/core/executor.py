@@ -0,0 +1,137 @@
+"""
+Bounded thread-pool executor for background work.
+
+Wraps ThreadPoolExecutor with a cap on queued jobs, a backpressure policy
+for when the cap is reached, graceful draining and job counters.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# What submit() does when the queue is full
+POLICY_BLOCK = 'block'              # wait up to block_timeout for a slot, then reject
+POLICY_REJECT = 'reject'            # reject immediately
+POLICY_CALLER_RUNS = 'caller_runs'  # run the job synchronously in the caller
+POLICIES = (POLICY_BLOCK, POLICY_REJECT, POLICY_CALLER_RUNS)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is rejected because the executor queue is full."""
+
+
+class BoundedExecutor:
+    """A fixed-size thread pool that accepts at most max_queue waiting jobs."""
+
+    def __init__(self, max_workers=4, max_queue=100, policy=POLICY_BLOCK, block_timeout=5.0, name='background'):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown backpressure policy {policy!r}; expected one of {POLICIES}')
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # One slot per running or waiting job
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._counters = {
+            'queued': 0,
+            'running': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'rejected': 0,
+            'ran_in_caller': 0,
+        }
+
+    def _bump(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._counters[key] += delta
+
+    def _acquire_slot(self):
+        if self.policy == POLICY_BLOCK:
+            return self._slots.acquire(timeout=self.block_timeout)
+        return self._slots.acquire(blocking=False)
+
+    def _run(self, fn, args, kwargs):
+        self._bump(queued=-1, running=1)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._bump(running=-1, failed=1)
+            logger.exception(f'{self.name} job {getattr(fn, "__name__", fn)} failed')
+            raise
+        finally:
+            self._slots.release()
+        self._bump(running=-1, succeeded=1)
+        return result
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule fn(*args, **kwargs) and return a Future.
+
+        Raises:
+            QueueFullError: if the queue is full and the policy rejects the job
+        """
+        if self._shutdown:
+            raise QueueFullError(f'{self.name} executor is shutting down')
+
+        if not self._acquire_slot():
+            if self.policy == POLICY_CALLER_RUNS:
+                self._bump(ran_in_caller=1)
+                future = Future()
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+                return future
+            self._bump(rejected=1)
+            raise QueueFullError(f'{self.name} executor queue is full ({self.max_queue} waiting jobs)')
+
+        self._bump(queued=1)
+        try:
+            return self._pool.submit(self._run, fn, args, kwargs)
+        except RuntimeError:
+            # Pool was shut down between the check above and submit()
+            self._slots.release()
+            self._bump(queued=-1, rejected=1)
+            raise QueueFullError(f'{self.name} executor is shutting down')
+
+    def shutdown(self, timeout=None):
+        """
+        Stop accepting jobs and wait for queued and running ones to finish.
+
+        Returns True if everything drained within `timeout` seconds. On
+        timeout, jobs still waiting are cancelled, so the pool only has its
+        running jobs left to finish.
+
+        concurrent.futures joins every pool thread at interpreter exit,
+        before atexit hooks run and with no timeout. Calling this first
+        (e.g. from gunicorn's worker_exit hook) is what bounds that wait to
+        the jobs already running.
+        """
+        self._shutdown = True
+        done = threading.Event()
+
+        def _drain():
+            self._pool.shutdown(wait=True)
+            done.set()
+
+        threading.Thread(target=_drain, name=f'{self.name}-drain', daemon=True).start()
+        drained = done.wait(timeout)
+        if not drained:
+            logger.warning(f'{self.name} executor did not drain within {timeout}s; '
+                           f'{self.stats()["queued"]} queued job(s) abandoned')
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        return drained
+
+    def stats(self):
+        """Return a snapshot of job counters for monitoring."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(max_workers=self.max_workers, max_queue=self.max_queue, policy=self.policy)
+        return stats
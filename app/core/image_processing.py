@@ -0,0 +1,164 @@
+"""
+Off-request processing of uploaded images.
+
+Uploads are handed to a process pool so CPU-heavy decoding, resizing and
+color extraction run outside the web worker (and outside its GIL). When a job
+finishes, a callback in the web process stores the capped image as a blob of
+its own, points the user at it and marks it ready; the customize page polls
+profile.customize_status for it.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+import atexit
+import logging
+import multiprocessing
+import os
+import posixpath
+import shutil
+import tempfile
+import threading
+
+from flask import current_app
+from app.core.uploads import file_digest, store_file
+from app.models import db, User, UploadBlob
+from app.utils.color_extractor import extract_colors_from_image
+from app.utils.images import DEFAULT_MAX_DIMENSION, cap_upload, process_upload
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+
+# Raw uploads wait in uploads/incoming/ (never cached as immutable, never
+# shown) while their capped copies go to uploads/backgrounds/
+INCOMING_FOLDER = 'incoming'
+BACKGROUND_FOLDER = 'backgrounds'
+
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+
+def get_image_pool(app=None):
+    """Get (creating on first use) the process-wide image processing pool."""
+    global _image_pool
+    if _image_pool is None:
+        with _image_pool_lock:
+            if _image_pool is None:
+                config = (app or current_app).config
+                # Spawned (not forked) children never inherit the web worker's
+                # threads, locks or database connections
+                _image_pool = ProcessPoolExecutor(
+                    max_workers=config.get('IMAGE_PROCESSING_WORKERS', 2),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                atexit.register(shutdown_image_pool)
+    return _image_pool
+
+
+def shutdown_image_pool(wait=True):
+    """Stop the image pool; called at interpreter exit and from gunicorn's worker_exit hook."""
+    global _image_pool
+    pool, _image_pool = _image_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def process_background_image(path, stored_path, max_dimension=DEFAULT_MAX_DIMENSION, variants=None):
+    """
+    Runs in a pool process: cap, resize and analyse an uploaded background image.
+
+    The upload at `path` is stored under the hash of its raw bytes, so it is
+    never changed. Its capped copy goes to a temp file beside it, and the
+    result names that copy by its own hash, under BACKGROUND_FOLDER, for
+    store_file(). Pass the blob's
+    existing `variants` to skip resizing an already processed image.
+    """
+    if variants is not None:
+        return {'path': stored_path, 'tmp_path': None, 'variants': variants,
+                'colors': extract_colors_from_image(path)}
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-', suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copyfile(path, tmp_path)
+        cap_upload(tmp_path, max_dimension)
+        name = file_digest(tmp_path) + posixpath.splitext(stored_path)[1]
+        capped_path = posixpath.join('uploads', BACKGROUND_FOLDER, name)
+        # A capped copy already on disk is a stored blob with its own copies
+        uploads_dir = os.path.dirname(os.path.dirname(path))
+        if capped_path != stored_path and os.path.exists(os.path.join(uploads_dir, BACKGROUND_FOLDER, name)):
+            variants = None
+        else:
+            variants = process_upload(tmp_path, capped_path, 'background')
+        colors = extract_colors_from_image(tmp_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return {'path': capped_path, 'tmp_path': tmp_path, 'variants': variants, 'colors': colors}
+
+
+def _apply_background_result(app, user_id, image, future):
+    """Store a finished job's result, unless the user has uploaded another image since."""
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        try:
+            result = future.result()
+        except Exception as e:
+            if user is not None and user.custom_bg_image == image:
+                logger.error(f"Processing background image {image} for user {user_id} failed: {e}")
+                user.bg_processing_status = STATUS_FAILED
+                db.session.commit()
+            return
+        # The capped copy is a blob of its own; the raw upload is collected
+        # once nothing references it
+        if result['tmp_path'] is not None:
+            blob = store_file(result['tmp_path'], result['path'])
+        else:
+            blob = UploadBlob.query.filter_by(path=result['path']).first()
+        # Resized copies belong to the blob, so they are reused (or collected) with it
+        if blob is not None and blob.variants is None:
+            blob.variants = result['variants'] or process_upload(
+                os.path.join(app.static_folder, blob.path), blob.path, 'background')
+        if user is None or user.custom_bg_image != image:
+            db.session.commit()
+            return
+        colors = result['colors']
+        user.custom_bg_image = result['path']
+        user.custom_bg_variants = blob.variants if blob is not None else result['variants']
+        user.custom_bg_color = colors['bg_color']
+        user.custom_text_color = colors['text_color']
+        user.custom_accent_color = colors['accent_color']
+        user.bg_processing_status = STATUS_READY
+        db.session.commit()
+
+
+def submit_background_image(user_id, path, image, variants=None):
+    """
+    Queue an uploaded background for processing.
+
+    Args:
+        user_id: Owner of the upload
+        path: Filesystem path of the saved upload
+        image: Value stored in User.custom_bg_image for this upload
+        variants: Resized copies the blob already has, if any
+
+    The caller should have committed bg_processing_status = 'pending' first.
+    If the pool cannot take the job it runs inline, as before.
+    """
+    app = current_app._get_current_object()
+    max_dimension = app.config.get('IMAGE_MAX_DIMENSION', DEFAULT_MAX_DIMENSION)
+    try:
+        future = get_image_pool(app).submit(process_background_image, path, image, max_dimension, variants)
+    except RuntimeError as e:
+        # Pool broken or shutting down; drop it so the next upload starts a fresh one
+        logger.warning(f"Image pool unavailable ({e}); processing {image} inline")
+        shutdown_image_pool(wait=False)
+        future = Future()
+        try:
+            future.set_result(process_background_image(path, image, max_dimension, variants))
+        except Exception as exc:
+            future.set_exception(exc)
+        _apply_background_result(app, user_id, image, future)
+        return
+    future.add_done_callback(lambda f: _apply_background_result(app, user_id, image, f))
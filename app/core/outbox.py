@@ -0,0 +1,357 @@
+"""
+Durable email outbox.
+
+Web requests only insert rows into the email_outbox table; a separate worker
+process (`flask email-worker`) claims due jobs in batches, sends them and
+records the outcome of every recipient. Failed sends are retried with
+exponential backoff. A newsletter fan-out is first expanded into one row per
+subscriber, a chunk at a time with its progress saved, so a restarted worker
+carries on exactly where the previous one stopped. Finished jobs are pruned
+by the worker once they are older than EMAIL_OUTBOX_RETENTION_DAYS.
+"""
+
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import time
+import uuid
+
+from flask import current_app
+from sqlalchemy import and_, exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import aliased
+from app.core import mail
+from app.core.emails import compile_article_notification, compile_welcome_email, send_message
+from app.models import db, Article, EmailJob, Newsletter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_BASE = 30
+DEFAULT_BACKOFF_MAX = 3600
+DEFAULT_FANOUT_CHUNK_SIZE = 500
+DEFAULT_RETENTION_DAYS = 30
+# Seconds between prune sweeps of an idle worker
+PRUNE_INTERVAL = 3600
+
+
+# ========================================
+# Enqueueing (called from web requests)
+# ========================================
+
+def enqueue_welcome_email(subscriber_email):
+    """Record a welcome email to be sent by the outbox worker."""
+    job = EmailJob(kind=EmailJob.KIND_WELCOME, recipient=subscriber_email)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def enqueue_article_notification(article_id):
+    """Record a newsletter fan-out for an article; the worker expands it per subscriber."""
+    job = EmailJob(kind=EmailJob.KIND_ARTICLE_FANOUT, article_id=article_id)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+# ========================================
+# Worker
+# ========================================
+
+def _due_condition(now):
+    """Jobs that are waiting for their next attempt, or whose worker lease expired."""
+    return or_(
+        and_(EmailJob.status == EmailJob.STATUS_PENDING, EmailJob.next_attempt_at <= now),
+        and_(EmailJob.status == EmailJob.STATUS_SENDING, EmailJob.locked_until < now),
+    )
+
+
+def claim_jobs(worker_id, batch_size=DEFAULT_BATCH_SIZE, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Lease up to `batch_size` due jobs to this worker.
+
+    The UPDATE re-checks the due condition, so when two workers race for the
+    same rows only one of them gets each job.
+    """
+    now = datetime.utcnow()
+    ids = db.session.scalars(
+        select(EmailJob.id)
+        .where(_due_condition(now))
+        .order_by(EmailJob.id)
+        .limit(batch_size)
+    ).all()
+    if not ids:
+        return []
+
+    claim = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    db.session.execute(
+        update(EmailJob)
+        .where(EmailJob.id.in_(ids), _due_condition(now))
+        .values(status=EmailJob.STATUS_SENDING,
+                claimed_by=claim,
+                locked_until=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return (EmailJob.query
+            .filter(EmailJob.claimed_by == claim, EmailJob.status == EmailJob.STATUS_SENDING)
+            .order_by(EmailJob.id)
+            .all())
+
+
+def expand_fanout(job, chunk_size=DEFAULT_FANOUT_CHUNK_SIZE):
+    """
+    Insert one notification row per active subscriber for a fan-out job.
+
+    Each chunk and the job's progress cursor are committed together, so an
+    interrupted expansion resumes after the last subscriber it recorded.
+    Returns the number of rows inserted.
+    """
+    inserted = 0
+    cursor = job.progress_cursor or 0
+
+    while True:
+        chunk_ids = db.session.scalars(
+            select(Newsletter.id)
+            .where(Newsletter.is_active == 1, Newsletter.id > cursor)
+            .order_by(Newsletter.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk_ids:
+            break
+        chunk_end = chunk_ids[-1]
+
+        now = datetime.utcnow()
+        already_queued = exists().where(
+            EmailJob.kind == EmailJob.KIND_ARTICLE_NOTIFICATION,
+            EmailJob.article_id == job.article_id,
+            EmailJob.recipient == Newsletter.email,
+        )
+        result = db.session.execute(
+            insert(EmailJob).from_select(
+                ['kind', 'article_id', 'recipient', 'status', 'attempts', 'next_attempt_at', 'created_at'],
+                select(
+                    literal(EmailJob.KIND_ARTICLE_NOTIFICATION),
+                    literal(job.article_id),
+                    Newsletter.email,
+                    literal(EmailJob.STATUS_PENDING),
+                    literal(0),
+                    literal(now),
+                    literal(now),
+                ).where(
+                    Newsletter.is_active == 1,
+                    Newsletter.id > cursor,
+                    Newsletter.id <= chunk_end,
+                    ~already_queued,
+                )
+            )
+        )
+        inserted += max(result.rowcount or 0, 0)
+        cursor = chunk_end
+        job.progress_cursor = cursor
+        db.session.commit()
+
+    return inserted
+
+
+def _backoff_delay(attempts, base, maximum):
+    return min(base * 2 ** (attempts - 1), maximum)
+
+
+def _mark_sent(job):
+    job.status = EmailJob.STATUS_SENT
+    job.sent_at = datetime.utcnow()
+    job.locked_until = None
+    job.last_error = None
+
+
+def _mark_failed(job, error, max_attempts, backoff_base, backoff_max, retry=True):
+    job.attempts += 1
+    job.last_error = str(error)[:1000]
+    job.locked_until = None
+    if retry and job.attempts < max_attempts:
+        job.status = EmailJob.STATUS_PENDING
+        job.next_attempt_at = datetime.utcnow() + timedelta(
+            seconds=_backoff_delay(job.attempts, backoff_base, backoff_max))
+    else:
+        job.status = EmailJob.STATUS_FAILED
+
+
+def process_jobs(jobs, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, fanout_chunk_size=DEFAULT_FANOUT_CHUNK_SIZE):
+    """
+    Send a batch of claimed jobs over one SMTP connection.
+
+    Every job's outcome is committed as soon as it is known. Returns a dict
+    of sent/failed/retried email counts, plus the fan-outs expanded.
+    """
+    counts = {'sent': 0, 'retried': 0, 'failed': 0, 'expanded': 0}
+    notifications = {}
+    compiled = {}
+
+    def fail(job, error, retry=True):
+        _mark_failed(job, error, max_attempts, backoff_base, backoff_max, retry=retry)
+        counts['failed' if job.status == EmailJob.STATUS_FAILED else 'retried'] += 1
+        db.session.commit()
+
+    def get_notification(article_id):
+        # Each article's email is compiled once per batch, then stamped per recipient
+        if article_id not in notifications:
+            article = db.session.get(Article, article_id)
+            notifications[article_id] = compile_article_notification(article) if article else None
+        return notifications[article_id]
+
+    def get_welcome():
+        if 'welcome' not in compiled:
+            compiled['welcome'] = compile_welcome_email()
+        return compiled['welcome']
+
+    def build_message(compiled_email, job):
+        # An address that cannot be encoded never will be; do not retry it
+        try:
+            return compiled_email.message_for(job.recipient)
+        except ValueError as e:
+            logger.error(f"Email job {job.id} ({job.kind} to {job.recipient!r}) cannot be built: {e}")
+            fail(job, e, retry=False)
+            return None
+
+    try:
+        with mail.connect() as conn:
+            for job in jobs:
+                try:
+                    if job.kind == EmailJob.KIND_ARTICLE_FANOUT:
+                        if get_notification(job.article_id) is None:
+                            fail(job, f"Article with ID {job.article_id} not found", retry=False)
+                            continue
+                        created = expand_fanout(job, chunk_size=fanout_chunk_size)
+                        logger.info(f"Queued {created} notification(s) for article {job.article_id}")
+                    elif job.kind == EmailJob.KIND_WELCOME:
+                        message = build_message(get_welcome(), job)
+                        if message is None:
+                            continue
+                        send_message(conn, message)
+                    elif job.kind == EmailJob.KIND_ARTICLE_NOTIFICATION:
+                        notification = get_notification(job.article_id)
+                        if notification is None:
+                            fail(job, f"Article with ID {job.article_id} not found", retry=False)
+                            continue
+                        message = build_message(notification, job)
+                        if message is None:
+                            continue
+                        send_message(conn, message)
+                    else:
+                        fail(job, f"Unknown email job kind {job.kind!r}", retry=False)
+                        continue
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Email job {job.id} ({job.kind} to {job.recipient}) failed: {e}")
+                    fail(job, e)
+                    continue
+
+                _mark_sent(job)
+                counts['expanded' if job.kind == EmailJob.KIND_ARTICLE_FANOUT else 'sent'] += 1
+                db.session.commit()
+    except Exception as e:
+        # Connecting (or disconnecting) failed; retry whatever was not settled
+        db.session.rollback()
+        logger.error(f"SMTP connection for outbox batch failed: {e}")
+        for job in jobs:
+            if job.status == EmailJob.STATUS_SENDING:
+                fail(job, e)
+
+    return counts
+
+
+def prune_jobs(retention_days=DEFAULT_RETENTION_DAYS, batch_size=1000):
+    """
+    Delete sent and failed jobs finished more than `retention_days` ago.
+
+    Notifications of an article whose fan-out is still pending are kept, as
+    the fan-out skips the subscribers they cover. Rows go in committed
+    batches; returns the number deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    fanout = aliased(EmailJob)
+    running_fanout = exists().where(
+        fanout.kind == EmailJob.KIND_ARTICLE_FANOUT,
+        fanout.article_id == EmailJob.article_id,
+        fanout.status.in_((EmailJob.STATUS_PENDING, EmailJob.STATUS_SENDING)),
+    )
+    deleted = 0
+    while True:
+        ids = db.session.scalars(
+            select(EmailJob.id)
+            .where(EmailJob.status.in_((EmailJob.STATUS_SENT, EmailJob.STATUS_FAILED)),
+                   func.coalesce(EmailJob.sent_at, EmailJob.created_at) < cutoff,
+                   ~running_fanout)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        db.session.execute(
+            EmailJob.__table__.delete().where(EmailJob.id.in_(ids))
+        )
+        db.session.commit()
+        deleted += len(ids)
+    if deleted:
+        logger.info(f"Pruned {deleted} finished outbox job(s)")
+    return deleted
+
+
+def default_worker_id():
+    """Identify this worker process in claimed_by."""
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def run_worker(batch_size=None, poll_interval=None, once=False, should_stop=lambda: False, worker_id=None):
+    """
+    Claim and send outbox jobs until `should_stop()` returns True.
+
+    With once=True, returns as soon as no due jobs are left. While idle, it
+    prunes old finished jobs at most every PRUNE_INTERVAL seconds. Must be
+    called inside an app context.
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get('EMAIL_OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    poll_interval = config.get('EMAIL_OUTBOX_POLL_INTERVAL', 5.0) if poll_interval is None else poll_interval
+    lease_seconds = config.get('EMAIL_OUTBOX_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+    options = {
+        'max_attempts': config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+        'backoff_base': config.get('EMAIL_OUTBOX_BACKOFF_BASE', DEFAULT_BACKOFF_BASE),
+        'backoff_max': config.get('EMAIL_OUTBOX_BACKOFF_MAX', DEFAULT_BACKOFF_MAX),
+        'fanout_chunk_size': config.get('EMAIL_OUTBOX_FANOUT_CHUNK_SIZE', DEFAULT_FANOUT_CHUNK_SIZE),
+    }
+    retention_days = config.get('EMAIL_OUTBOX_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    worker_id = worker_id or default_worker_id()
+    totals = {'sent': 0, 'retried': 0, 'failed': 0, 'expanded': 0, 'pruned': 0}
+    last_prune = None
+
+    while not should_stop():
+        jobs = claim_jobs(worker_id, batch_size=batch_size, lease_seconds=lease_seconds)
+        if jobs:
+            counts = process_jobs(jobs, **options)
+            for key, value in counts.items():
+                totals[key] += value
+            # Keep memory flat through large fan-outs
+            db.session.expunge_all()
+            continue
+        if retention_days and (last_prune is None or time.monotonic() - last_prune >= PRUNE_INTERVAL):
+            totals['pruned'] += prune_jobs(retention_days)
+            last_prune = time.monotonic()
+        if once:
+            break
+        time.sleep(poll_interval)
+
+    return totals
+
+
+def outbox_stats():
+    """Number of outbox jobs in each status."""
+    rows = db.session.execute(
+        select(EmailJob.status, func.count(EmailJob.id)).group_by(EmailJob.status)
+    ).all()
+    return {status: count for status, count in rows}
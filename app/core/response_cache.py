@@ -0,0 +1,281 @@
+"""
+Full-page response cache for anonymous visitors.
+
+Rendered public pages are kept in a process-local LRU bounded by entry count
+and bytes. Entries expire after a TTL and are invalidated by tag when the
+articles, comments, likes, pages or settings they were built from change.
+Each worker has its own cache, so changes made through another worker show
+up here once the TTL expires.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+from flask import current_app, request, session, g
+from flask_wtf.csrf import generate_csrf
+from sqlalchemy import event
+from app.models import db, Article, Comment, Like, CustomPage, SiteSettings, User
+
+# Public endpoints whose anonymous responses may be cached
+CACHEABLE_ENDPOINTS = {
+    'public.index',
+    'public.about',
+    'public.articles',
+    'public.article_detail',
+    'public.view_page',
+}
+
+# Tag that invalidates every entry
+ALL = '*'
+
+# Stands in for the per-session CSRF token inside stored page bodies
+CSRF_PLACEHOLDER = b'__RESPONSE_CACHE_CSRF_TOKEN__'
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered responses with TTL and tag invalidation."""
+
+    def __init__(self, ttl=60, max_entries=1000, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def configure(self, ttl, max_entries, max_bytes):
+        """Apply new limits, evicting entries if needed."""
+        with self._lock:
+            self.ttl = ttl
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _remove(self, key):
+        # Caller must hold the lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._current_bytes -= entry['size']
+        for tag in entry['tags']:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _evict(self):
+        # Caller must hold the lock
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self._current_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._evictions += 1
+
+    def get(self, key):
+        """Return a stored entry, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry['expires_at'] <= time.monotonic():
+                self._remove(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def set(self, key, status, headers, body, tags):
+        """Store a response body and headers under `key` with the given tags."""
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {
+                'status': status,
+                'headers': headers,
+                'body': body,
+                'tags': frozenset(tags),
+                'size': size,
+                'expires_at': time.monotonic() + self.ttl,
+            }
+            self._current_bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._stores += 1
+            self._evict()
+
+    def invalidate(self, tags):
+        """Drop every entry carrying any of `tags` (or everything for ALL)."""
+        with self._lock:
+            if ALL in tags:
+                self._invalidations += len(self._entries)
+                self._entries.clear()
+                self._tags.clear()
+                self._current_bytes = 0
+                return
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self._invalidations += 1
+
+    def clear(self):
+        """Drop all entries."""
+        self.invalidate({ALL})
+
+    def stats(self):
+        """Return a snapshot of cache counters for monitoring."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stores': self._stores,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
+
+
+# Process-wide cache used by the request hooks below
+response_cache = ResponseCache()
+
+
+def tag_response(*tags):
+    """Attach extra invalidation tags to the response being built."""
+    g.setdefault('response_cache_tags', set()).update(tags)
+
+
+def _endpoint_tags():
+    """Default tags for the current cacheable endpoint."""
+    view_args = request.view_args or {}
+    if request.endpoint == 'public.articles':
+        return {'articles'}
+    if request.endpoint == 'public.view_page':
+        return {f"page:{view_args.get('slug')}"}
+    if request.endpoint == 'public.article_detail':
+        # The view adds an article:<id> tag via tag_response()
+        return set()
+    return {'site'}
+
+
+def _is_anonymous_request():
+    return not session.get('logged_in') and '_flashes' not in session
+
+
+def _serve_cached():
+    """before_request hook: answer from the cache when possible."""
+    if request.method != 'GET' or request.endpoint not in CACHEABLE_ENDPOINTS:
+        return None
+    if not _is_anonymous_request():
+        return None
+
+    key = (request.full_path, SiteSettings.get_cached().version)
+    entry = response_cache.get(key)
+    if entry is None:
+        # Remember the key so after_request can store the rendered page
+        g.response_cache_key = key
+        return None
+
+    body = entry['body']
+    if CSRF_PLACEHOLDER in body:
+        body = body.replace(CSRF_PLACEHOLDER, generate_csrf().encode('ascii'))
+
+    response = current_app.response_class(body, status=entry['status'], headers=entry['headers'])
+    response.headers['X-Cache'] = 'HIT'
+    # Honour If-None-Match / If-Modified-Since against the stored validators
+    return response.make_conditional(request)
+
+
+def _store_response(response):
+    """after_request hook: store cacheable anonymous responses."""
+    key = g.pop('response_cache_key', None)
+    if key is None:
+        return response
+
+    if (response.status_code != 200 or response.direct_passthrough or
+            'Set-Cookie' in response.headers or
+            response.cache_control.no_store or response.cache_control.private or
+            not _is_anonymous_request()):
+        return response
+
+    body = response.get_data()
+    token = g.get('csrf_token')
+    if token:
+        body = body.replace(token.encode('ascii'), CSRF_PLACEHOLDER)
+
+    headers = [(name, value) for name, value in response.headers
+               if name.lower() not in ('content-length', 'set-cookie')]
+    tags = _endpoint_tags() | g.get('response_cache_tags', set())
+    response_cache.set(key, response.status_code, headers, body, tags)
+    response.headers['X-Cache'] = 'MISS'
+    return response
+
+
+def _tags_for_change(obj):
+    """Map a changed model instance to the cache tags it affects."""
+    if isinstance(obj, Article):
+        return {'articles', f'article:{obj.id}'}
+    if isinstance(obj, (Comment, Like)):
+        return {'articles', f'article:{obj.article_id}'}
+    if isinstance(obj, (CustomPage, SiteSettings, User)):
+        # Pages feed the nav on every page; settings and authors show everywhere
+        return {ALL}
+    return set()
+
+
+def _collect_changes(session, flush_context):
+    tags = session.info.setdefault('response_cache_tags', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        tags |= _tags_for_change(obj)
+
+
+def _apply_invalidations(session):
+    tags = session.info.pop('response_cache_tags', None)
+    if tags:
+        response_cache.invalidate(tags)
+
+
+def _discard_invalidations(session):
+    session.info.pop('response_cache_tags', None)
+
+
+_listeners_registered = False
+
+
+def init_response_cache(app):
+    """Configure the response cache and register its request/session hooks."""
+    global _listeners_registered
+
+    response_cache.configure(
+        ttl=app.config.get('RESPONSE_CACHE_TTL', 60),
+        max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1000),
+        max_bytes=app.config.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+    )
+
+    # Invalidate on every commit, even when serving from cache is disabled,
+    # so toggling the flag never exposes stale entries
+    if not _listeners_registered:
+        event.listen(db.session, 'after_flush', _collect_changes)
+        event.listen(db.session, 'after_commit', _apply_invalidations)
+        event.listen(db.session, 'after_soft_rollback', lambda session, previous: _discard_invalidations(session))
+        _listeners_registered = True
+
+    if app.config.get('RESPONSE_CACHE_ENABLED', False):
+        app.before_request(_serve_cached)
+        app.after_request(_store_response)
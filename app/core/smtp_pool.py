@@ -0,0 +1,217 @@
+"""
+Pool of concurrent SMTP connections for newsletter fan-out.
+
+Recipients are fed through a bounded work queue to N worker threads, each
+holding its own Flask-Mail connection. A shared rate limiter caps messages
+per second across the pool, connections are recycled after a fixed number
+of messages, and transient failures (4xx replies, dropped connections) are
+retried with exponential backoff.
+"""
+
+import logging
+import queue
+import smtplib
+import threading
+import time
+
+from flask import current_app
+from app.core import mail
+from app.core.emails import send_message
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Seconds the producer waits on a full queue before checking the workers again
+_PUT_TIMEOUT = 0.5
+
+
+class RateLimiter:
+    """Spaces out acquire() calls to at most `rate` per second across threads (0 = unlimited)."""
+
+    def __init__(self, rate=0):
+        self.rate = rate
+        self._interval = 1.0 / rate if rate else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self._interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Process-wide limiters so concurrent fan-outs share one budget
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(rate):
+    """Return the process-wide limiter for `rate` messages per second."""
+    with _rate_limiters_lock:
+        if rate not in _rate_limiters:
+            _rate_limiters[rate] = RateLimiter(rate)
+        return _rate_limiters[rate]
+
+
+def is_transient(error):
+    """True if an SMTP error is worth retrying (4xx reply or dropped connection)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # Socket-level failures (refused, reset, timeout); other SMTP errors are permanent
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def _keeps_connection(error):
+    # Per-message rejections leave the session usable; anything else reconnects
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code != 421
+
+
+class SMTPPool:
+    """Send one message per recipient over several SMTP connections at once."""
+
+    def __init__(self, connections=4, rate_limiter=None, max_per_connection=100,
+                 max_retries=3, retry_backoff=0.5):
+        self.connections = max(1, connections)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_per_connection = max_per_connection
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a pool from the NEWSLETTER_SMTP_* settings."""
+        return cls(
+            connections=config.get('NEWSLETTER_SMTP_CONNECTIONS', 4),
+            rate_limiter=get_rate_limiter(config.get('NEWSLETTER_RATE_LIMIT', 0)),
+            max_per_connection=config.get('NEWSLETTER_SMTP_MAX_PER_CONNECTION', 100),
+            max_retries=config.get('NEWSLETTER_SMTP_RETRIES', 3),
+            retry_backoff=config.get('NEWSLETTER_SMTP_RETRY_BACKOFF', 0.5),
+        )
+
+    def send(self, recipients, build_message):
+        """
+        Send build_message(recipient) to every recipient.
+
+        `recipients` is consumed lazily in the calling thread, so it may be a
+        database-backed generator. A recipient whose message cannot be built
+        counts as failed. If the server cannot be reached at all, or every
+        worker thread has died, sending stops early and the result has
+        aborted=True.
+
+        Returns:
+            dict: sent, failed and retried counts, plus aborted
+        """
+        app = current_app._get_current_object()
+        work = queue.Queue(maxsize=self.connections * 100)
+        aborted = threading.Event()
+        stats = {'sent': 0, 'failed': 0, 'retried': 0}
+        stats_lock = threading.Lock()
+
+        def bump(key):
+            with stats_lock:
+                stats[key] += 1
+
+        workers = [
+            threading.Thread(target=self._worker, args=(app, work, build_message, bump, aborted),
+                             name=f'smtp-pool-{i}', daemon=True)
+            for i in range(self.connections)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def put(item):
+            # Never block on a full queue that no live worker will drain
+            while any(worker.is_alive() for worker in workers):
+                try:
+                    work.put(item, timeout=_PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    continue
+            if not aborted.is_set():
+                logger.error("All SMTP pool workers have exited; stopping the send")
+                aborted.set()
+            return False
+
+        for recipient in recipients:
+            if aborted.is_set() or not put(recipient):
+                break
+        for _ in workers:
+            if not put(_STOP):
+                break
+        for worker in workers:
+            worker.join()
+
+        stats['aborted'] = aborted.is_set()
+        return stats
+
+    def _close(self, conn):
+        try:
+            conn.__exit__(None, None, None)
+        except Exception:
+            pass  # Connection already dropped
+
+    def _worker(self, app, work, build_message, bump, aborted):
+        with app.app_context():
+            conn = None
+            sent_on_conn = 0
+            try:
+                while True:
+                    recipient = work.get()
+                    if recipient is _STOP:
+                        break
+                    if aborted.is_set():
+                        bump('failed')
+                        continue
+
+                    try:
+                        message = build_message(recipient)
+                    except Exception as e:
+                        # e.g. an address that cannot be encoded; only this recipient fails
+                        logger.error(f"Failed to build email to {recipient}: {e}")
+                        bump('failed')
+                        continue
+                    for attempt in range(self.max_retries + 1):
+                        connecting = conn is None
+                        try:
+                            if connecting:
+                                conn = mail.connect().__enter__()
+                                sent_on_conn = 0
+                            self.rate_limiter.acquire()
+                            send_message(conn, message)
+                        except Exception as e:
+                            if conn is not None and not _keeps_connection(e):
+                                self._close(conn)
+                                conn = None
+                            if is_transient(e) and attempt < self.max_retries:
+                                bump('retried')
+                                time.sleep(self.retry_backoff * 2 ** attempt)
+                                continue
+                            logger.error(f"Failed to send email to {recipient}: {e}")
+                            bump('failed')
+                            if connecting:
+                                # The server is unreachable; stop feeding the pool
+                                aborted.set()
+                            break
+
+                        bump('sent')
+                        sent_on_conn += 1
+                        if sent_on_conn >= self.max_per_connection:
+                            self._close(conn)
+                            conn = None
+                        break
+            finally:
+                if conn is not None:
+                    self._close(conn)
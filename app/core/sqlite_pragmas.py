@@ -0,0 +1,95 @@
+"""
+Per-connection SQLite tuning.
+
+SQLite's defaults (rollback journal, synchronous=FULL, a 2 MB page cache)
+make every write block all readers and fsync twice, so likes and comments
+from several gunicorn workers end up queueing on the database lock. A
+`connect` listener applies the SQLITE_* settings from config to every new
+pool connection:
+
+- journal_mode=WAL: readers and the single writer no longer block each other
+- synchronous=NORMAL: in WAL mode, only checkpoints fsync; a power loss can
+  drop the last commits but never corrupts the database
+- busy_timeout: how long a writer waits for the lock before failing with
+  "database is locked"
+- cache_size, mmap_size, temp_store: keep hot pages, the file and sorts in memory
+
+Settings left as None (or '') keep SQLite's default; :memory: databases
+silently stay in memory journal mode. Other databases are left alone.
+"""
+
+from sqlalchemy import event
+
+# Config key -> (pragma, default)
+PRAGMA_SETTINGS = {
+    'SQLITE_JOURNAL_MODE': ('journal_mode', 'WAL'),
+    'SQLITE_SYNCHRONOUS': ('synchronous', 'NORMAL'),
+    'SQLITE_BUSY_TIMEOUT': ('busy_timeout', 5000),
+    'SQLITE_CACHE_SIZE': ('cache_size', -64000),
+    'SQLITE_MMAP_SIZE': ('mmap_size', 256 * 1024 * 1024),
+    'SQLITE_TEMP_STORE': ('temp_store', 'MEMORY'),
+}
+
+# Keyword pragmas only accept these values; the rest are integers
+_KEYWORDS = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'},
+}
+
+
+def sqlite_pragmas(config):
+    """
+    Validated (pragma, value) pairs to apply, from a config mapping.
+
+    Raises:
+        ValueError: For a value the pragma does not accept. PRAGMA values
+        cannot be bound as parameters, so nothing unchecked reaches the SQL.
+    """
+    pragmas = []
+    for key, (pragma, default) in PRAGMA_SETTINGS.items():
+        value = config.get(key, default)
+        if value is None or value == '':
+            continue
+        if pragma in _KEYWORDS:
+            value = str(value).upper()
+            if value not in _KEYWORDS[pragma]:
+                raise ValueError(f"{key} must be one of {', '.join(sorted(_KEYWORDS[pragma]))}, not {value!r}")
+        else:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be an integer, not {value!r}") from None
+        pragmas.append((pragma, value))
+    return pragmas
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run the pragmas on a raw DB-API connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in pragmas:
+            cursor.execute(f'PRAGMA {pragma}={value}')
+    finally:
+        cursor.close()
+
+
+def init_sqlite_pragmas(app, db):
+    """
+    Apply the SQLITE_* pragmas to every connection of the app's SQLite engine.
+
+    Must run before the engine opens its first connection (right after
+    db.init_app). Returns the pragmas, or None for non-SQLite databases.
+    """
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return None
+
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    return pragmas
@@ -0,0 +1,139 @@
+"""
+Fingerprinted static URLs with far-future caching.
+
+At startup every file under the static folder (except user uploads) is
+hashed into a manifest, and url_for('static', filename=...) appends
+?v=<hash> for files in it. A request whose v matches the file's current
+hash is answered with a one-year immutable Cache-Control, so browsers stop
+revalidating css/main.css on every page. Content-addressed uploads (see
+app/core/uploads.py) carry their hash in the name and are cached the same
+way, except raw uploads still waiting to be processed. Any other file is served exactly as before.
+"""
+
+import hashlib
+import os
+import re
+import threading
+
+from flask import request
+
+DEFAULT_MAX_AGE = 31536000  # One year
+
+# Hex digits of the SHA-256 used in ?v=
+FINGERPRINT_LENGTH = 12
+
+# Uploads and their resized copies named by content hash: immutable by
+# construction. Raw backgrounds in uploads/incoming/ still await capping
+# (and EXIF stripping), so they are never pinned in caches.
+CONTENT_ADDRESSED_UPLOAD = re.compile(r'^uploads/(?!incoming/)[^/]+/[0-9a-f]{64}(-\d+w)?\.[A-Za-z0-9]+$')
+
+
+def file_fingerprint(path, chunk_size=64 * 1024):
+    """Short SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+class StaticManifest:
+    """
+    Maps static filenames (as passed to url_for) to content fingerprints.
+
+    With reload=True (debug mode) files are re-stat'ed on lookup and
+    re-hashed when they change, so edits show up without a restart.
+    """
+
+    def __init__(self, root, exclude=('uploads',), reload=False):
+        self.root = os.path.abspath(root)
+        self.exclude = tuple(exclude)
+        self.reload = reload
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _stat_key(self, path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _excluded(self, filename):
+        return filename.split('/', 1)[0] in self.exclude
+
+    def build(self):
+        """Hash every file under root; returns the number of entries."""
+        entries = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            relative_dir = os.path.relpath(dirpath, self.root).replace(os.sep, '/')
+            if relative_dir != '.' and self._excluded(relative_dir):
+                dirnames[:] = []
+                continue
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                filename = name if relative_dir == '.' else f'{relative_dir}/{name}'
+                if self._excluded(filename):
+                    continue
+                entries[filename] = (self._stat_key(path), file_fingerprint(path))
+        with self._lock:
+            self._entries = entries
+        return len(entries)
+
+    def get(self, filename):
+        """Fingerprint for `filename`, or None if it is not in the manifest."""
+        if not filename:
+            return None
+        entry = self._entries.get(filename)
+        if not self.reload:
+            return entry[1] if entry else None
+
+        if self._excluded(filename):
+            return None
+        path = os.path.join(self.root, *filename.split('/'))
+        try:
+            stat_key = self._stat_key(path)
+        except OSError:
+            return None
+        if entry is None or entry[0] != stat_key:
+            entry = (stat_key, file_fingerprint(path))
+            with self._lock:
+                self._entries[filename] = entry
+        return entry[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def init_static_assets(app):
+    """Build the manifest and register the url_for and Cache-Control hooks."""
+    if not app.config.get('STATIC_FINGERPRINTS_ENABLED', True) or not app.static_folder:
+        return None
+
+    manifest = StaticManifest(app.static_folder, reload=app.debug)
+    manifest.build()
+    app.extensions['static_manifest'] = manifest
+    max_age = app.config.get('STATIC_MAX_AGE', DEFAULT_MAX_AGE)
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'v' not in values:
+            fingerprint = manifest.get(values.get('filename'))
+            if fingerprint:
+                values['v'] = fingerprint
+
+    @app.after_request
+    def cache_fingerprinted_static(response):
+        if request.endpoint != 'static' or response.status_code not in (200, 206, 304):
+            return response
+        filename = (request.view_args or {}).get('filename', '')
+        version = request.args.get('v')
+        # A stale or made-up v is served normally, never pinned for a year
+        if (version and version == manifest.get(filename)) or CONTENT_ADDRESSED_UPLOAD.match(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.cache_control.immutable = True
+        return response
+
+    return manifest
@@ -1,9 +1,13 @@
-"""Background email tasks using threading (no Celery/Redis needed)."""
+"""Background email tasks using a bounded thread pool (no Celery/Redis needed)."""
 
-from flask import url_for, current_app
-from flask_mail import Message
+from flask import current_app
 from app.core import mail
+from app.core.emails import compile_article_notification, compile_welcome_email, send_message
+from app.core.executor import BoundedExecutor
+from app.core.smtp_pool import SMTPPool
 from app.models import Newsletter, Article
+import atexit
+import itertools
 import logging
 import threading
 
@@ -14,256 +18,16 @@ logger = logging.getLogger(__name__)
 # Synchronous Email Functions
 # ========================================
 
-def send_welcome_email_sync(subscriber_email):
-    """Send welcome email synchronously (without Celery)."""
-    subject = "🎉 Welcome to Sealy's Flask Blog!"
+def send_welcome_email_sync(subscriber_email, connection=None):
+    """Send welcome email synchronously (without Celery), optionally over an open SMTP connection."""
+    msg = compile_welcome_email().message_for(subscriber_email)
     
     try:
-        unsubscribe_url = url_for('public.newsletter_unsubscribe', email=subscriber_email, _external=True)
-        articles_url = url_for('public.articles', _external=True)
-        home_url = url_for('public.index', _external=True)
-    except:
-        unsubscribe_url = f"https://yourblog.com/newsletter/unsubscribe?email={subscriber_email}"
-        articles_url = "https://yourblog.com/articles/"
-        home_url = "https://yourblog.com/"
-    
-    body = f"""
-Welcome to Sealy's Flask Blog Newsletter!
-
-Hi there! 👋
-
-Thank you for subscribing to our newsletter. You'll now be the first to know whenever we publish new articles on development, technology, and programming.
-
-What you can expect:
-• Thoughtful articles on software development
-• Tips and tutorials for Flask and Python
-• Updates on new projects and experiments
-• No spam, ever - just quality content
-
-Browse our articles: {articles_url}
-Visit our homepage: {home_url}
-
----
-Best regards,
-The Sealy's Flask Blog Team
-
-If you wish to unsubscribe at any time: {unsubscribe_url}
-© 2025 Sealy's Flask Blog
-"""
-    
-    html = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Welcome to Sealy's Flask Blog</title>
-    <!--[if mso]>
-    <noscript>
-        <xml>
-            <o:OfficeDocumentSettings>
-                <o:PixelsPerInch>96</o:PixelsPerInch>
-            </o:OfficeDocumentSettings>
-        </xml>
-    </noscript>
-    <![endif]-->
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background-color: #f5f5f5;
-            padding: 20px;
-        }}
-        .email-container {{
-            max-width: 600px;
-            margin: 0 auto;
-            background: #ffffff;
-            border-radius: 12px;
-            overflow: hidden;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }}
-        .header {{
-            background: linear-gradient(135deg, #7c3aed 0%, #06b6d4 100%);
-            color: white;
-            padding: 40px 30px;
-            text-align: center;
-        }}
-        .header h1 {{
-            font-size: 28px;
-            margin-bottom: 10px;
-            font-weight: 700;
-        }}
-        .header p {{
-            font-size: 16px;
-            opacity: 0.95;
-        }}
-        .content {{
-            padding: 40px 30px;
-        }}
-        .content h2 {{
-            color: #1a1a1a;
-            font-size: 22px;
-            margin-bottom: 20px;
-        }}
-        .content p {{
-            color: #4a4a4a;
-            margin-bottom: 15px;
-            font-size: 16px;
-        }}
-        .benefits {{
-            background: #f8f9fa;
-            border-left: 4px solid #7c3aed;
-            padding: 20px;
-            margin: 25px 0;
-            border-radius: 6px;
-        }}
-        .benefits ul {{
-            list-style: none;
-            padding: 0;
-        }}
-        .benefits li {{
-            padding: 8px 0;
-            color: #333;
-            font-size: 15px;
-        }}
-        .benefits li:before {{
-            content: "✓ ";
-            color: #06b6d4;
-            font-weight: bold;
-            margin-right: 8px;
-        }}
-        .button {{
-            display: inline-block;
-            padding: 14px 32px;
-            background: linear-gradient(135deg, #7c3aed 0%, #06b6d4 100%);
-            color: white !important;
-            text-decoration: none;
-            border-radius: 8px;
-            font-weight: 600;
-            font-size: 16px;
-            margin: 10px 8px;
-            transition: transform 0.2s;
-            text-align: center;
-        }}
-        .button:hover {{
-            transform: translateY(-2px);
-        }}
-        .button-secondary {{
-            background: #ffffff;
-            color: #7c3aed !important;
-            border: 2px solid #7c3aed;
-        }}
-        .cta-section {{
-            text-align: center;
-            margin: 30px 0;
-        }}
-        .footer {{
-            background: #f8f9fa;
-            padding: 30px;
-            text-align: center;
-            color: #666;
-            font-size: 14px;
-        }}
-        .footer p {{
-            margin: 8px 0;
-        }}
-        .social-links {{
-            margin: 20px 0;
-        }}
-        .social-links a {{
-            color: #7c3aed;
-            text-decoration: none;
-            margin: 0 10px;
-            font-weight: 500;
-        }}
-        .unsubscribe {{
-            font-size: 12px;
-            color: #999;
-            margin-top: 20px;
-        }}
-        .unsubscribe a {{
-            color: #999;
-            text-decoration: underline;
-        }}
-        @media only screen and (max-width: 600px) {{
-            .email-container {{
-                border-radius: 0;
-            }}
-            .header, .content, .footer {{
-                padding: 25px 20px;
-            }}
-            .button {{
-                display: block;
-                margin: 10px 0;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="email-container">
-        <div class="header">
-            <h1>🎉 Welcome Aboard!</h1>
-            <p>You're now part of the Sealy's Flask Blog community</p>
-        </div>
-        
-        <div class="content">
-            <h2>Hi there! 👋</h2>
-            <p>Thank you for subscribing to our newsletter. We're thrilled to have you join our community of developers and tech enthusiasts!</p>
-            
-            <div class="benefits">
-                <ul>
-                    <li>Get notified about new articles on Flask, Python, and web development</li>
-                    <li>Learn tips, tricks, and best practices from real projects</li>
-                    <li>Stay updated on our latest experiments and tutorials</li>
-                    <li>Join a community passionate about clean code and modern web development</li>
-                </ul>
-            </div>
-            
-            <p>We publish thoughtful, in-depth content regularly, and we promise to never spam your inbox. Every email we send will be worth your time.</p>
-            
-            <div class="cta-section">
-                <a href="{articles_url}" class="button">Browse All Articles</a>
-                <a href="{home_url}" class="button button-secondary">Visit Homepage</a>
-            </div>
-        </div>
-        
-        <div class="footer">
-            <p style="font-weight: 600; color: #333; margin-bottom: 15px;">Sealy's Flask Blog</p>
-            <p>Sharing knowledge, one article at a time.</p>
-            
-            <div class="social-links">
-                <a href="{home_url}">Website</a> •
-                <a href="{articles_url}">Articles</a> •
-                <a href="{home_url}about/">About</a>
-            </div>
-            
-            <p style="color: #999; margin-top: 20px;">© 2025 Sealy's Flask Blog. All rights reserved.</p>
-            
-            <div class="unsubscribe">
-                <p>Don't want to receive these emails?<br>
-                <a href="{unsubscribe_url}">Unsubscribe here</a></p>
-            </div>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    
-    msg = Message(
-        subject=subject,
-        recipients=[subscriber_email],
-        body=body,
-        html=html
-    )
-    
-    try:
-        mail.send(msg)
+        if connection is None:
+            with mail.connect() as conn:
+                send_message(conn, msg)
+        else:
+            send_message(connection, msg)
         logger.info(f"Welcome email sent to {subscriber_email}")
         return True
     except Exception as e:
@@ -279,341 +43,118 @@ def send_article_notification_sync(article_id):
     if not article:
         raise Exception(f"Article with ID {article_id} not found")
     
-    # Get all active subscribers
-    subscribers = Newsletter.query.filter_by(is_active=1).all()
-    if not subscribers:
+    # Stream active subscriber emails in keyset chunks rather than loading them all
+    chunk_size = current_app.config.get('NEWSLETTER_CHUNK_SIZE', 500)
+    emails = Newsletter.iter_active_emails(chunk_size)
+    first_email = next(emails, None)
+    if first_email is None:
         logger.info("No active subscribers to notify")
         return
     
-    subject = f"📝 New Article: {article.title}"
+    # Render once; each recipient only gets their own To header and unsubscribe link
+    notification = compile_article_notification(article)
     
-    try:
-        article_url = url_for('public.article_detail', slug=article.slug, _external=True)
-        articles_url = url_for('public.articles', _external=True)
-        home_url = url_for('public.index', _external=True)
-    except:
-        article_url = f"https://yourblog.com/articles/{article.slug}"
-        articles_url = "https://yourblog.com/articles/"
-        home_url = "https://yourblog.com/"
+    # Fan out over several SMTP connections, rate limited and with retries
+    pool = SMTPPool.from_config(current_app.config)
+    result = pool.send(itertools.chain([first_email], emails), notification.message_for)
     
-    sent_count = 0
-    failed_count = 0
-    
-    with mail.connect() as conn:
-        for subscriber in subscribers:
-            try:
-                unsubscribe_url = url_for('public.newsletter_unsubscribe', email=subscriber.email, _external=True)
-            except:
-                unsubscribe_url = f"https://yourblog.com/newsletter/unsubscribe?email={subscriber.email}"
-            
-            body = f"""
-New Article Published on Sealy's Flask Blog!
-
-{article.title}
-
-{article.summary or 'Check out this new article!'}
+    if result['aborted']:
+        logger.error("Article notifications aborted: the SMTP server could not be reached")
+    logger.info(f"Article notifications sent: {result['sent']} successful, {result['failed']} failed, "
+                f"{result['retried']} retried")
+    return result['sent']
 
-Read the full article: {article_url}
-Browse all articles: {articles_url}
 
----
-Enjoying our content? Share it with your friends!
+# ========================================
+# Background Email Sending (bounded thread pool)
+# ========================================
+# Jobs run on one shared, bounded executor per process instead of a new
+# thread per call, so bursts queue up rather than spawning hundreds of
+# threads and SMTP connections. No Redis/Celery required.
+
+_email_executor = None
+_email_executor_lock = threading.Lock()
+
+
+def get_email_executor(app=None):
+    """Get (creating on first use) the process-wide email executor."""
+    global _email_executor
+    if _email_executor is None:
+        with _email_executor_lock:
+            if _email_executor is None:
+                config = (app or current_app).config
+                _email_executor = BoundedExecutor(
+                    max_workers=config.get('EMAIL_EXECUTOR_WORKERS', 2),
+                    max_queue=config.get('EMAIL_EXECUTOR_QUEUE_SIZE', 100),
+                    policy=config.get('EMAIL_EXECUTOR_POLICY', 'block'),
+                    block_timeout=config.get('EMAIL_EXECUTOR_BLOCK_TIMEOUT', 2.0),
+                    name='email',
+                )
+                # A fallback only: at interpreter exit, concurrent.futures has
+                # already waited for every job; gunicorn's worker_exit hook
+                # calls shutdown_email_executor() in time to bound that wait
+                drain_timeout = config.get('EMAIL_EXECUTOR_DRAIN_TIMEOUT', 25.0)
+                atexit.register(shutdown_email_executor, drain_timeout)
+    return _email_executor
+
+
+def shutdown_email_executor(timeout=25.0):
+    """Drain queued email jobs; called at interpreter exit and from gunicorn's worker_exit hook."""
+    executor = _email_executor
+    if executor is None:
+        return True
+    return executor.shutdown(timeout=timeout)
 
-To unsubscribe from these notifications: {unsubscribe_url}
-© 2025 Sealy's Flask Blog
-"""
-            
-            html = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{article.title}</title>
-    <!--[if mso]>
-    <noscript>
-        <xml>
-            <o:OfficeDocumentSettings>
-                <o:PixelsPerInch>96</o:PixelsPerInch>
-            </o:OfficeDocumentSettings>
-        </xml>
-    </noscript>
-    <![endif]-->
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Helvetica, Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background-color: #f5f5f5;
-            padding: 20px;
-        }}
-        .email-container {{
-            max-width: 600px;
-            margin: 0 auto;
-            background: #ffffff;
-            border-radius: 12px;
-            overflow: hidden;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }}
-        .header {{
-            background: linear-gradient(135deg, #7c3aed 0%, #06b6d4 100%);
-            color: white;
-            padding: 40px 30px;
-            text-align: center;
-        }}
-        .header h1 {{
-            font-size: 24px;
-            margin-bottom: 8px;
-            font-weight: 700;
-        }}
-        .header p {{
-            font-size: 14px;
-            opacity: 0.95;
-        }}
-        .content {{
-            padding: 40px 30px;
-        }}
-        .article-card {{
-            background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-            border-left: 5px solid #7c3aed;
-            padding: 30px;
-            margin: 25px 0;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05);
-        }}
-        .article-card h2 {{
-            color: #1a1a1a;
-            font-size: 24px;
-            margin-bottom: 15px;
-            line-height: 1.3;
-        }}
-        .article-card p {{
-            color: #4a4a4a;
-            font-size: 16px;
-            margin-bottom: 20px;
-            line-height: 1.7;
-        }}
-        .article-meta {{
-            color: #7c3aed;
-            font-size: 13px;
-            font-weight: 600;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            margin-bottom: 12px;
-        }}
-        .button {{
-            display: inline-block;
-            padding: 14px 32px;
-            background: linear-gradient(135deg, #7c3aed 0%, #06b6d4 100%);
-            color: white !important;
-            text-decoration: none;
-            border-radius: 8px;
-            font-weight: 600;
-            font-size: 16px;
-            margin: 10px 8px 10px 0;
-            transition: transform 0.2s;
-            text-align: center;
-        }}
-        .button:hover {{
-            transform: translateY(-2px);
-        }}
-        .button-secondary {{
-            background: #ffffff;
-            color: #7c3aed !important;
-            border: 2px solid #7c3aed;
-        }}
-        .cta-section {{
-            text-align: center;
-            margin: 30px 0;
-        }}
-        .divider {{
-            height: 1px;
-            background: linear-gradient(to right, transparent, #e0e0e0, transparent);
-            margin: 30px 0;
-        }}
-        .info-box {{
-            background: #f8f9fa;
-            border-radius: 8px;
-            padding: 20px;
-            margin: 25px 0;
-            text-align: center;
-        }}
-        .info-box p {{
-            color: #666;
-            font-size: 14px;
-            margin: 5px 0;
-        }}
-        .footer {{
-            background: #f8f9fa;
-            padding: 30px;
-            text-align: center;
-            color: #666;
-            font-size: 14px;
-        }}
-        .footer p {{
-            margin: 8px 0;
-        }}
-        .social-links {{
-            margin: 20px 0;
-        }}
-        .social-links a {{
-            color: #7c3aed;
-            text-decoration: none;
-            margin: 0 10px;
-            font-weight: 500;
-        }}
-        .unsubscribe {{
-            font-size: 12px;
-            color: #999;
-            margin-top: 20px;
-        }}
-        .unsubscribe a {{
-            color: #999;
-            text-decoration: underline;
-        }}
-        @media only screen and (max-width: 600px) {{
-            .email-container {{
-                border-radius: 0;
-            }}
-            .header, .content, .footer {{
-                padding: 25px 20px;
-            }}
-            .article-card {{
-                padding: 20px;
-            }}
-            .button {{
-                display: block;
-                margin: 10px 0;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="email-container">
-        <div class="header">
-            <h1>📝 New Article Published!</h1>
-            <p>Fresh content just for you</p>
-        </div>
-        
-        <div class="content">
-            <div class="article-card">
-                <div class="article-meta">✨ Latest Article</div>
-                <h2>{article.title}</h2>
-                <p>{article.summary or 'Check out this new article!'}</p>
-            </div>
-            
-            <div class="cta-section">
-                <a href="{article_url}" class="button">Read Full Article →</a>
-            </div>
-            
-            <div class="divider"></div>
-            
-            <div class="info-box">
-                <p style="font-weight: 600; color: #333; margin-bottom: 10px;">💡 Want More?</p>
-                <p>Explore our complete collection of articles and tutorials.</p>
-                <div style="margin-top: 15px;">
-                    <a href="{articles_url}" class="button button-secondary">Browse All Articles</a>
-                </div>
-            </div>
-        </div>
-        
-        <div class="footer">
-            <p style="font-weight: 600; color: #333; margin-bottom: 15px;">Sealy's Flask Blog</p>
-            <p>Thank you for being a valued subscriber!</p>
-            
-            <div class="social-links">
-                <a href="{home_url}">Website</a> •
-                <a href="{articles_url}">Articles</a> •
-                <a href="{home_url}about/">About</a>
-            </div>
-            
-            <p style="color: #999; margin-top: 20px;">© 2025 Sealy's Flask Blog. All rights reserved.</p>
-            
-            <div class="unsubscribe">
-                <p>Don't want to receive these emails?<br>
-                <a href="{unsubscribe_url}">Unsubscribe here</a></p>
-            </div>
-        </div>
-    </div>
-</body>
-</html>
-"""
-            
-            msg = Message(
-                subject=subject,
-                recipients=[subscriber.email],
-                body=body,
-                html=html
-            )
-            
-            try:
-                conn.send(msg)
-                sent_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send email to {subscriber.email}: {e}")
-                failed_count += 1
-    
-    logger.info(f"Article notifications sent: {sent_count} successful, {failed_count} failed")
-    return sent_count
 
+def email_executor_stats():
+    """Counters for the email executor, or None if it has not been started."""
+    executor = _email_executor
+    return executor.stats() if executor is not None else None
 
-# ========================================
-# Threading-based Background Email Sending
-# ========================================
-# These functions send emails in background threads without requiring Redis/Celery
 
 def send_welcome_email_async(app, subscriber_email):
-    """Send welcome email in a background thread."""
+    """Send welcome email from a worker thread (failures are logged and counted by the executor)."""
     with app.app_context():
-        try:
-            send_welcome_email_sync(subscriber_email)
-        except Exception as e:
-            logger.error(f"Background thread error sending welcome email: {e}")
+        send_welcome_email_sync(subscriber_email)
 
 
 def send_article_notification_async(app, article_id):
-    """Send article notifications in a background thread."""
+    """Send article notifications from a worker thread (failures are logged and counted by the executor)."""
     with app.app_context():
-        try:
-            send_article_notification_sync(article_id)
-        except Exception as e:
-            logger.error(f"Background thread error sending article notifications: {e}")
+        send_article_notification_sync(article_id)
 
 
 def send_welcome_email_background(subscriber_email):
     """
-    Send welcome email in background thread (no Redis/Celery needed).
-    This is perfect for free hosting tiers like Render.com.
+    Record a welcome email in the outbox, or queue it on the shared email
+    executor when EMAIL_DELIVERY is 'executor'.
+    
+    Raises QueueFullError if the executor applies backpressure.
     """
-    from flask import current_app
-    app = current_app._get_current_object()
+    if current_app.config.get('EMAIL_DELIVERY', 'outbox') == 'outbox':
+        from app.core.outbox import enqueue_welcome_email
+        enqueue_welcome_email(subscriber_email)
+        logger.info(f"Added welcome email to {subscriber_email} to the outbox")
+        return
     
-    thread = threading.Thread(
-        target=send_welcome_email_async,
-        args=(app, subscriber_email),
-        daemon=True
-    )
-    thread.start()
-    logger.info(f"Started background thread to send welcome email to {subscriber_email}")
+    app = current_app._get_current_object()
+    get_email_executor(app).submit(send_welcome_email_async, app, subscriber_email)
+    logger.info(f"Queued welcome email to {subscriber_email}")
 
 
 def send_article_notification_background(article_id):
     """
-    Send article notifications in background thread (no Redis/Celery needed).
-    This is perfect for free hosting tiers like Render.com.
+    Record article notifications in the outbox, or queue them on the shared
+    email executor when EMAIL_DELIVERY is 'executor'.
+    
+    Raises QueueFullError if the executor applies backpressure.
     """
-    from flask import current_app
-    app = current_app._get_current_object()
+    if current_app.config.get('EMAIL_DELIVERY', 'outbox') == 'outbox':
+        from app.core.outbox import enqueue_article_notification
+        enqueue_article_notification(article_id)
+        logger.info(f"Added article {article_id} notifications to the outbox")
+        return
     
-    thread = threading.Thread(
-        target=send_article_notification_async,
-        args=(app, article_id),
-        daemon=True
-    )
-    thread.start()
-    logger.info(f"Started background thread to send article notifications for article {article_id}")
+    app = current_app._get_current_object()
+    get_email_executor(app).submit(send_article_notification_async, app, article_id)
+    logger.info(f"Queued article notifications for article {article_id}")
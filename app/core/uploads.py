@@ -0,0 +1,254 @@
+"""
+Content-addressed storage for uploaded images.
+
+Uploads are streamed to disk and stored as uploads/<folder>/<sha256><ext>,
+named after their final bytes (images are capped first), so the same image
+uploaded twice is one file (with one set of resized copies) and a URL
+always serves the same bytes.
+An UploadBlob row per file counts the references to it from the columns in
+app.models.UPLOAD_REFERENCES; the counts move inside the same flush that
+changes those columns, and collect_garbage() deletes files nobody uses,
+from a background thread (schedule_garbage_collection()) or `flask gc-uploads`.
+"""
+
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import os
+from pathlib import Path
+import posixpath
+import tempfile
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from app.models import db, UploadBlob
+from app.utils.images import DEFAULT_MAX_DIMENSION, cap_upload, process_upload, remove_image
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_GC_GRACE_SECONDS = 600
+DEFAULT_GC_INTERVAL_SECONDS = 300
+
+_gc_lock = threading.Lock()
+_gc_next_run = 0.0
+
+
+def _static_folder(static_folder=None):
+    return Path(static_folder or current_app.static_folder)
+
+
+def _stream_to_temp(stream, directory):
+    """Copy a stream into a temp file in `directory`, hashing as it goes."""
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest()
+
+
+def file_digest(path):
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_file(tmp_path, path, static_folder=None):
+    """
+    Move a finished temp file into place as the blob `path`.
+
+    Args:
+        tmp_path: File in the blob's folder; it is consumed either way
+        path: uploads/<folder>/<sha256 of tmp_path's bytes><ext>
+        static_folder: Defaults to the app's static folder
+
+    Returns:
+        UploadBlob: The (possibly pre-existing) blob
+    """
+    target = _static_folder(static_folder) / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        while True:
+            # Touching the row locks it until commit and restarts its grace
+            # period, so a concurrent collect_garbage() cannot remove it
+            touched = db.session.execute(
+                update(UploadBlob).where(UploadBlob.path == path).values(last_used_at=datetime.utcnow())
+            ).rowcount
+            if touched and target.exists():
+                break
+            # New (or just collected) blob: write the file, then the row.
+            # mkstemp() files are 0600; blobs are served as static files
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+            if touched:
+                # Its copies were most likely collected with it; clearing the
+                # variants has them generated again
+                db.session.execute(update(UploadBlob).where(UploadBlob.path == path).values(variants=None))
+                break
+            try:
+                with db.session.begin_nested():
+                    db.session.add(UploadBlob(path=path, digest=target.stem))
+                break
+            except IntegrityError:
+                continue  # Inserted concurrently; touch that row instead
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return db.session.execute(select(UploadBlob).where(UploadBlob.path == path)).scalar_one()
+
+
+def store_upload(file, folder, static_folder=None, max_dimension=None):
+    """
+    Store an uploaded file under uploads/<folder>/ by its SHA-256.
+
+    The name is the hash of the stored bytes, which never change afterwards:
+    with `max_dimension`, the upload is capped (see cap_upload) before it is
+    hashed and named.
+
+    Args:
+        file: A werkzeug FileStorage; it is read in chunks, never as a whole
+        folder: Subfolder of static/uploads, e.g. 'profiles'
+        static_folder: Defaults to the app's static folder
+        max_dimension: Longest edge for images; None stores the bytes as uploaded
+
+    Returns:
+        UploadBlob: The (possibly pre-existing) blob. Assigning blob.path to
+        one of the reference columns is what keeps it alive.
+    """
+    directory = _static_folder(static_folder) / 'uploads' / folder
+    directory.mkdir(parents=True, exist_ok=True)
+    ext = os.path.splitext(secure_filename(file.filename or ''))[1].lower()
+
+    tmp_path, digest = _stream_to_temp(file.stream, directory)
+    try:
+        if max_dimension:
+            cap_upload(tmp_path, max_dimension)
+            digest = file_digest(tmp_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return store_file(tmp_path, posixpath.join('uploads', folder, f'{digest}{ext}'), static_folder)
+
+
+def store_image(file, folder, kind, static_folder=None):
+    """
+    store_upload() a capped image and make sure its resized copies exist.
+
+    Copies are generated once per blob (see app.utils.images.process_upload),
+    so re-uploading a known image costs only the cap and the hash.
+    """
+    blob = store_upload(file, folder, static_folder,
+                        max_dimension=current_app.config.get('IMAGE_MAX_DIMENSION', DEFAULT_MAX_DIMENSION))
+    if blob.variants is None:
+        blob.variants = process_upload(_static_folder(static_folder) / blob.path, blob.path, kind)
+    return blob
+
+
+def is_blob(path):
+    """True if `path` is managed by content-addressed storage."""
+    if not path:
+        return False
+    return db.session.execute(select(UploadBlob.id).where(UploadBlob.path == path)).first() is not None
+
+
+def discard_upload(path, variants=None, static_folder=None):
+    """
+    Delete a file stored before content-addressed storage.
+
+    Blobs are left alone; they go once their refcount drops to zero.
+    """
+    if path and not is_blob(path):
+        remove_image(_static_folder(static_folder), path, variants)
+
+
+def collect_garbage(grace_seconds=None, static_folder=None, batch_size=100):
+    """
+    Delete blobs (and their resized copies) that nothing references.
+
+    Only blobs unreferenced for longer than UPLOAD_GC_GRACE_SECONDS are
+    collected. Rows are deleted and committed before their files, and a
+    file rewritten after the sweep started is kept.
+
+    Returns:
+        int: Number of blobs removed
+    """
+    if grace_seconds is None:
+        grace_seconds = current_app.config.get('UPLOAD_GC_GRACE_SECONDS', DEFAULT_GC_GRACE_SECONDS)
+    static_folder = _static_folder(static_folder)
+    started = time.time()
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    unreferenced = (UploadBlob.refcount <= 0, UploadBlob.last_used_at < cutoff)
+
+    removed = []
+    candidates = db.session.execute(
+        select(UploadBlob.id, UploadBlob.path, UploadBlob.variants).where(*unreferenced).limit(batch_size)
+    ).all()
+    for blob_id, path, variants in candidates:
+        # Re-checked per row: it may have been referenced since the select
+        deleted = db.session.execute(
+            UploadBlob.__table__.delete().where(UploadBlob.id == blob_id, *unreferenced)
+        ).rowcount
+        if deleted:
+            removed.append((path, variants))
+    db.session.commit()
+
+    for path, variants in removed:
+        paths = [path] + [copy for variant in variants or [] for copy in (variant['webp'], variant['fallback'])]
+        for stored in paths:
+            file_path = static_folder / stored
+            try:
+                if file_path.stat().st_mtime < started:
+                    file_path.unlink()
+            except FileNotFoundError:
+                pass
+    if removed:
+        logger.info(f"Collected {len(removed)} unreferenced upload(s)")
+    return len(removed)
+
+
+def _collect_in_background(app):
+    with app.app_context():
+        try:
+            while collect_garbage():
+                pass
+        except Exception:
+            logger.exception("Upload garbage collection failed")
+
+
+def schedule_garbage_collection(app=None):
+    """
+    Start collect_garbage() on a background thread and return at once.
+
+    Runs at most once per UPLOAD_GC_INTERVAL_SECONDS per process, so requests
+    that change uploads can call it after every commit. Returns True if a
+    sweep was started.
+    """
+    global _gc_next_run
+    app = app or current_app._get_current_object()
+    interval = app.config.get('UPLOAD_GC_INTERVAL_SECONDS', DEFAULT_GC_INTERVAL_SECONDS)
+    with _gc_lock:
+        now = time.monotonic()
+        if now < _gc_next_run:
+            return False
+        _gc_next_run = now + interval
+    # Not a daemon: a sweep is short, and stopping it between deleting rows
+    # and deleting their files would leave the files behind
+    threading.Thread(target=_collect_in_background, args=(app,), name='upload-gc').start()
+    return True
@@ -0,0 +1,101 @@
+"""
+Per-user activity counts for the admin users page.
+
+Article, comment and like counts come from grouped aggregate subqueries
+outer-joined to the page of users, so a page costs two statements (the
+total and the page itself) however many users or rows there are. When the
+page is ordered by a user column, the users are paged first and only their
+rows are aggregated; ordering by a count has to aggregate every user.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
+
+from app.models import db, Article, Comment, Like, User
+from app.utils.pagination import OffsetPage
+
+DEFAULT_PER_PAGE = 50
+
+UserStats = namedtuple('UserStats', ['user', 'articles_count', 'comments_count', 'likes_count'])
+
+# Sort keys accepted from the query string
+USER_SORTS = {
+    'username': User.username,
+    'created_at': User.created_at,
+}
+COUNT_SORTS = ('articles', 'comments', 'likes')
+SORTS = tuple(USER_SORTS) + COUNT_SORTS
+
+# Only the columns the users table renders
+_USER_COLUMNS = load_only(
+    User.id, User.username, User.display_name, User.email, User.is_admin,
+    User.can_write_articles, User.created_at, User.profile_picture, User.profile_picture_variants,
+)
+
+
+def _counts_by(column, user_ids=None):
+    """Subquery of (user_id, n) rows counting `column` values, optionally for some users only."""
+    stmt = select(column.label('user_id'), func.count().label('n')).group_by(column)
+    if user_ids is not None:
+        stmt = stmt.where(column.in_(user_ids))
+    return stmt.subquery()
+
+
+def user_stats_page(page=1, per_page=DEFAULT_PER_PAGE, sort='created_at', direction='desc'):
+    """
+    One page of users with their article, comment and like counts.
+
+    Args:
+        page: 1-based page number, clamped to the pages that exist
+        per_page: Users per page
+        sort: One of SORTS; unknown values fall back to 'created_at'
+        direction: 'asc' or 'desc'
+
+    Returns:
+        OffsetPage: items are UserStats tuples
+    """
+    if sort not in SORTS:
+        sort = 'created_at'
+    descending = direction != 'asc'
+
+    total = db.session.scalar(select(func.count(User.id)))
+    page = OffsetPage.clamp(page, per_page, total)
+    offset = (page - 1) * per_page
+
+    def ordered(expression):
+        return expression.desc() if descending else expression.asc()
+
+    if sort in USER_SORTS:
+        # Pick this page's users by an indexed user column first
+        page_users = (select(User.id)
+                      .order_by(ordered(USER_SORTS[sort]), ordered(User.id))
+                      .limit(per_page).offset(offset)
+                      .subquery())
+        user_ids = select(page_users.c.id)
+    else:
+        page_users = user_ids = None
+
+    articles = _counts_by(Article.author_id, user_ids)
+    comments = _counts_by(Comment.user_id, user_ids)
+    likes = _counts_by(Like.user_id, user_ids)
+    articles_count = func.coalesce(articles.c.n, 0)
+    comments_count = func.coalesce(comments.c.n, 0)
+    likes_count = func.coalesce(likes.c.n, 0)
+
+    stmt = (select(User, articles_count, comments_count, likes_count)
+            .options(_USER_COLUMNS)
+            .outerjoin(articles, articles.c.user_id == User.id)
+            .outerjoin(comments, comments.c.user_id == User.id)
+            .outerjoin(likes, likes.c.user_id == User.id))
+    if page_users is not None:
+        stmt = (stmt.join(page_users, page_users.c.id == User.id)
+                .order_by(ordered(USER_SORTS[sort]), ordered(User.id)))
+    else:
+        count_column = {'articles': articles_count, 'comments': comments_count, 'likes': likes_count}[sort]
+        stmt = (stmt.order_by(ordered(count_column), ordered(User.id))
+                .limit(per_page).offset(offset))
+
+    items = [UserStats(*row) for row in db.session.execute(stmt).all()]
+    return OffsetPage(items, page, per_page, total)
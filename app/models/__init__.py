@@ -1,12 +1,68 @@
 """SQLAlchemy models for mdblogs application."""
 
+from collections import namedtuple
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func, or_, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only
 from werkzeug.security import generate_password_hash, check_password_hash
+from markupsafe import Markup
+from app.utils.markdown_renderer import render_markdown, content_hash
 import re
+import threading
 
 db = SQLAlchemy()
 
+# Inserts retried by add_with_unique_slug() before giving up
+SLUG_ATTEMPTS = 5
+
+
+def _allocate_slug(model, base, exclude_id=None):
+    """
+    Return `base`, or `base-N` with the lowest free N >= 2, unused by `model`.
+    
+    One indexed range query fetches every slug that is `base` or starts
+    with `base-` ('-' sorts just before '.'); the suffix is picked in memory.
+    """
+    column = model.slug
+    stmt = select(column).where(or_(column == base, (column >= f'{base}-') & (column < f'{base}.')))
+    if exclude_id:
+        stmt = stmt.where(model.id != exclude_id)
+    taken = set(db.session.scalars(stmt))
+    if base not in taken:
+        return base
+    i = 2
+    while f'{base}-{i}' in taken:
+        i += 1
+    return f'{base}-{i}'
+
+
+def add_with_unique_slug(obj, title, attempts=SLUG_ATTEMPTS):
+    """
+    Add a new Article or CustomPage with a slug generated from `title`.
+    
+    The row is flushed in the caller's transaction, which still has to
+    commit it. If a concurrent writer took the slug in the meantime, the
+    unique constraint fails, the whole transaction is rolled back and a
+    fresh slug is allocated, so call this before making other changes in
+    the session. The last IntegrityError is re-raised after `attempts` tries.
+    
+    No SAVEPOINT is used: pysqlite emits no BEGIN before one, so releasing
+    it would commit the row on its own.
+    """
+    for attempt in range(attempts):
+        obj.slug = type(obj).generate_slug(title)
+        db.session.add(obj)
+        try:
+            db.session.flush()
+            return obj
+        except IntegrityError:
+            # Also expunges obj, which keeps its attributes for the next try
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+
 
 class Article(db.Model):
     """Article model for blog posts."""
@@ -17,10 +73,17 @@ class Article(db.Model):
     title = db.Column(db.String(200), nullable=False)
     summary = db.Column(db.Text)
     content = db.Column(db.Text)
+    # Pre-rendered markdown and the hash of the content it was rendered from
+    content_html = db.Column(db.Text)
+    content_hash = db.Column(db.String(64))
     published = db.Column(db.Integer, nullable=False, default=0, index=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
     
+    # Denormalized counters, kept in sync by the Like/Comment mapper events below
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    approved_comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Author relationship
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     author = db.relationship('User', backref='articles', foreign_keys=[author_id])
@@ -29,6 +92,15 @@ class Article(db.Model):
     comments = db.relationship('Comment', backref='article', lazy='dynamic', cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='article', lazy='dynamic', cascade='all, delete-orphan')
     
+    # Serve the (created_at, id) keyset listings: published for the public
+    # list, all articles and per-author for the admin dashboard. title rides
+    # along so a title-prefix filter is checked without visiting the table.
+    __table_args__ = (
+        db.Index('ix_articles_published_created_at_id', 'published', 'created_at', 'id'),
+        db.Index('ix_articles_created_at_id_title', 'created_at', 'id', 'title'),
+        db.Index('ix_articles_author_id_created_at_id', 'author_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Article {self.slug}>'
     
@@ -45,40 +117,111 @@ class Article(db.Model):
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None,
             'author': self.author.to_dict() if self.author else None,
-            'comments_count': self.comments.count(),
-            'likes_count': self.likes.count(),
+            'comments_count': self.approved_comments_count or 0,
+            'likes_count': self.likes_count or 0,
+        }
+    
+    def to_list_dict(self):
+        """Lightweight dict for article cards; only touches columns loaded by listing_query()."""
+        return {
+            'id': self.id,
+            'slug': self.slug,
+            'title': self.title,
+            'summary': self.summary,
+            'published': bool(self.published),
+            'date': self.created_at,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'author': self.author.to_summary_dict() if self.author else None,
+            'comments_count': self.approved_comments_count or 0,
+            'likes_count': self.likes_count or 0,
         }
     
+    @staticmethod
+    def listing_query():
+        """
+        Base query for article list pages.
+        
+        Skips the content columns and joins in just the author fields the
+        cards render, so a page costs the same number of statements
+        regardless of how many articles it shows.
+        """
+        return Article.query.options(
+            load_only(
+                Article.id, Article.slug, Article.title, Article.summary,
+                Article.published, Article.created_at, Article.author_id,
+                Article.likes_count, Article.approved_comments_count,
+            ),
+            joinedload(Article.author).load_only(
+                User.id, User.username, User.display_name, User.profile_picture,
+                User.profile_picture_variants,
+            ),
+        )
+    
+    def render_content(self):
+        """Pre-render the markdown content and store it alongside its hash."""
+        self.content_html = str(render_markdown(self.content))
+        self.content_hash = content_hash(self.content)
+    
+    def get_content_html(self):
+        """Return stored HTML, falling back to live rendering if it is stale."""
+        if self.content_html is not None and self.content_hash == content_hash(self.content):
+            return Markup(self.content_html)
+        return render_markdown(self.content)
+    
     def get_likes_count(self):
         """Get the number of likes for this article."""
-        return self.likes.count()
+        return self.likes_count or 0
     
     def get_comments_count(self):
-        """Get the number of comments for this article."""
-        return self.comments.filter_by(approved=True).count()
+        """Get the number of approved comments for this article."""
+        return self.approved_comments_count or 0
+    
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recompute likes_count and approved_comments_count for every article.
+        
+        Returns the number of rows that had drifted and were repaired.
+        """
+        articles = Article.__table__
+        likes_subq = (select(func.count(Like.id))
+                      .where(Like.article_id == articles.c.id)
+                      .scalar_subquery())
+        comments_subq = (select(func.count(Comment.id))
+                         .where(Comment.article_id == articles.c.id, Comment.approved.is_(True))
+                         .scalar_subquery())
+        result = db.session.execute(
+            articles.update()
+            .where((articles.c.likes_count != likes_subq) |
+                   (articles.c.approved_comments_count != comments_subq))
+            .values(likes_count=likes_subq, approved_comments_count=comments_subq)
+        )
+        return result.rowcount
     
     def is_liked_by(self, user_id):
         """Check if a user has liked this article."""
         return self.likes.filter_by(user_id=user_id).first() is not None
     
+    def profiles_updated_at(self):
+        """
+        Latest User.updated_at among the author and approved commenters.
+
+        The article page shows their names and avatars, so this goes into
+        its validators; None if none of them has changed since the column
+        was added.
+        """
+        commenters = select(Comment.user_id).where(Comment.article_id == self.id, Comment.approved == True)
+        return db.session.execute(
+            select(func.max(User.updated_at)).where(or_(User.id == self.author_id, User.id.in_(commenters)))
+        ).scalar()
+    
     @staticmethod
     def generate_slug(title, exclude_id=None):
-        """Generate a unique slug from title."""
+        """Generate a unique slug from title (see add_with_unique_slug for inserting)."""
         base = re.sub(r"[^\w]+", "-", (title or '').lower()).strip('-')
         if not base:
             base = 'article'
-        
-        slug = base
-        i = 1
-        while True:
-            query = Article.query.filter_by(slug=slug)
-            if exclude_id:
-                query = query.filter(Article.id != exclude_id)
-            if not query.first():
-                break
-            i += 1
-            slug = f"{base}-{i}"
-        return slug
+        return _allocate_slug(Article, base, exclude_id)
 
 
 class User(db.Model):
@@ -91,6 +234,8 @@ class User(db.Model):
     is_admin = db.Column(db.Integer, nullable=False, default=0)
     must_change_password = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped by every change to the row; pages showing the user revalidate on it
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Permissions
     can_write_articles = db.Column(db.Integer, nullable=False, default=0)
@@ -100,6 +245,8 @@ class User(db.Model):
     email = db.Column(db.String(120))
     bio = db.Column(db.Text)
     profile_picture = db.Column(db.String(200))  # Filename or URL
+    # Resized copies of profile_picture, see app.utils.images.generate_derivatives()
+    profile_picture_variants = db.Column(db.JSON, nullable=True)
     location = db.Column(db.String(100))
     website = db.Column(db.String(200))
     
@@ -120,6 +267,14 @@ class User(db.Model):
     custom_font_size = db.Column(db.String(10), default='16px')
     custom_font_family = db.Column(db.String(100), default='system-ui')
     custom_bg_image = db.Column(db.String(255), nullable=True)  # Path to background image
+    custom_bg_variants = db.Column(db.JSON, nullable=True)
+    # None, 'pending', 'ready' or 'failed' while the upload is processed off-request
+    bg_processing_status = db.Column(db.String(20), nullable=True)
+    
+    # Default (newest first) order of the admin users page
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
     
     def set_password(self, password):
         """Hash and set the user's password."""
@@ -138,6 +293,7 @@ class User(db.Model):
             'email': self.email,
             'bio': self.bio,
             'profile_picture': self.profile_picture,
+            'profile_picture_variants': self.profile_picture_variants,
             'location': self.location,
             'website': self.website,
             'twitter': self.twitter,
@@ -154,9 +310,21 @@ class User(db.Model):
             'custom_font_size': self.custom_font_size,
             'custom_font_family': self.custom_font_family,
             'custom_bg_image': self.custom_bg_image,
+            'custom_bg_variants': self.custom_bg_variants,
+            'bg_processing_status': self.bg_processing_status,
             'created_at': self.created_at.strftime('%Y-%m-%d') if self.created_at else None,
         }
     
+    def to_summary_dict(self):
+        """Author fields shown next to articles and comments."""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'display_name': self.display_name or self.username,
+            'profile_picture': self.profile_picture,
+            'profile_picture_variants': self.profile_picture_variants,
+        }
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -178,11 +346,71 @@ class Newsletter(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
-    subscribed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    subscribed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     is_active = db.Column(db.Integer, nullable=False, default=1)
     
     def __repr__(self):
         return f'<Newsletter {self.email}>'
+    
+    @staticmethod
+    def iter_active_emails(chunk_size=500):
+        """
+        Yield active subscriber emails in id order, fetching `chunk_size` at a time.
+        
+        Each chunk is a keyset query over plain (id, email) rows, so no ORM
+        objects pile up in the session and memory stays flat for any list size.
+        """
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(Newsletter.id, Newsletter.email)
+                .where(Newsletter.is_active == 1, Newsletter.id > last_id)
+                .order_by(Newsletter.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                return
+            for _, email in rows:
+                yield email
+            last_id = rows[-1].id
+
+
+class EmailJob(db.Model):
+    """Outbox row for one email (or one newsletter fan-out) waiting to be sent."""
+    __tablename__ = 'email_outbox'
+
+    KIND_WELCOME = 'welcome'
+    KIND_ARTICLE_FANOUT = 'article_fanout'
+    KIND_ARTICLE_NOTIFICATION = 'article_notification'
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    recipient = db.Column(db.String(120), nullable=True)  # None for fan-out jobs
+    article_id = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    claimed_by = db.Column(db.String(100), nullable=True)
+    # Fan-out jobs: id of the last subscriber already expanded into rows
+    progress_cursor = db.Column(db.Integer, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # One notification per subscriber per article, even if a fan-out is resumed
+        db.UniqueConstraint('kind', 'article_id', 'recipient', name='uq_email_outbox_kind_article_recipient'),
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<EmailJob {self.id} {self.kind} {self.status}>'
 
 
 class Comment(db.Model):
@@ -201,6 +429,13 @@ class Comment(db.Model):
     # Relationships
     user = db.relationship('User', backref='comments', foreign_keys=[user_id])
     
+    # An article's approved comments newest first; a user's comments newest
+    # first (admin activity page) and counted per user (admin users page)
+    __table_args__ = (
+        db.Index('ix_comments_article_id_approved_created_at', 'article_id', 'approved', 'created_at'),
+        db.Index('ix_comments_user_id_created_at', 'user_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Comment {self.id} by User {self.user_id}>'
     
@@ -214,6 +449,7 @@ class Comment(db.Model):
                 'username': self.user.username,
                 'display_name': self.user.display_name or self.user.username,
                 'profile_picture': self.user.profile_picture,
+                'profile_picture_variants': self.user.profile_picture_variants,
             } if self.user else None,
             'approved': self.approved,
         }
@@ -233,18 +469,186 @@ class Like(db.Model):
     # Relationships
     user = db.relationship('User', backref='likes', foreign_keys=[user_id])
     
-    # Unique constraint to prevent duplicate likes
-    __table_args__ = (db.UniqueConstraint('article_id', 'user_id', name='unique_article_like'),)
+    # Unique constraint to prevent duplicate likes; its index also serves
+    # (article_id, user_id) lookups. A user's likes newest first and counted
+    # per user use the second index.
+    __table_args__ = (
+        db.UniqueConstraint('article_id', 'user_id', name='unique_article_like'),
+        db.Index('ix_likes_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     def __repr__(self):
         return f'<Like article={self.article_id} user={self.user_id}>'
 
 
+def _adjust_article_counter(connection, article_id, column_name, delta):
+    """Apply a counter delta to an article inside the current flush."""
+    articles = Article.__table__
+    column = articles.c[column_name]
+    connection.execute(
+        articles.update()
+        .where(articles.c.id == article_id)
+        .values({column_name: column + delta})
+    )
+
+
+# Counter maintenance runs inside the flush, so it commits or rolls back
+# together with the like/comment change (including ORM cascades).
+@event.listens_for(Like, 'after_insert')
+def _like_inserted(mapper, connection, target):
+    _adjust_article_counter(connection, target.article_id, 'likes_count', 1)
+
+
+@event.listens_for(Like, 'after_delete')
+def _like_deleted(mapper, connection, target):
+    _adjust_article_counter(connection, target.article_id, 'likes_count', -1)
+
+
+@event.listens_for(Comment, 'after_insert')
+def _comment_inserted(mapper, connection, target):
+    if target.approved:
+        _adjust_article_counter(connection, target.article_id, 'approved_comments_count', 1)
+
+
+@event.listens_for(Comment, 'after_delete')
+def _comment_deleted(mapper, connection, target):
+    if target.approved:
+        _adjust_article_counter(connection, target.article_id, 'approved_comments_count', -1)
+
+
+@event.listens_for(Comment, 'after_update')
+def _comment_updated(mapper, connection, target):
+    history = db.inspect(target).attrs.approved.history
+    if not history.has_changes():
+        return
+    was_approved = bool(history.deleted and history.deleted[0])
+    if bool(target.approved) != was_approved:
+        delta = 1 if target.approved else -1
+        _adjust_article_counter(connection, target.article_id, 'approved_comments_count', delta)
+
+
 # Initialize SiteSettings with db
 from app.models.site_settings import init_site_settings
 SiteSettings = init_site_settings(db)
 
 
+class UploadBlob(db.Model):
+    """An uploaded file stored under its content hash, shared by every row pointing at it."""
+    __tablename__ = 'upload_blobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Path relative to the static folder: uploads/<folder>/<sha256><ext>
+    path = db.Column(db.String(255), unique=True, nullable=False)
+    digest = db.Column(db.String(64), nullable=False, index=True)
+    # Number of UPLOAD_REFERENCES values equal to path, kept up to date on flush
+    refcount = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Resized copies, shared like the original (see app.utils.images)
+    variants = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Last time the blob was stored or lost a reference; unreferenced blobs are
+    # only collected once this is older than the GC grace period
+    last_used_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_upload_blobs_refcount_last_used_at', 'refcount', 'last_used_at'),
+    )
+    
+    def __repr__(self):
+        return f'<UploadBlob {self.path} refs={self.refcount}>'
+    
+    @staticmethod
+    def reconcile_refcounts():
+        """
+        Recompute every refcount from the columns that reference uploads.
+        
+        Returns the number of rows that had drifted and were repaired.
+        """
+        references = union_all(*(
+            select(column.label('path')).where(column.isnot(None))
+            for column in (getattr(model, name) for model, name in UPLOAD_REFERENCES)
+        )).subquery()
+        counts = dict(db.session.execute(
+            select(references.c.path, func.count()).group_by(references.c.path)
+        ).all())
+        
+        repaired = 0
+        for blob in UploadBlob.query.all():
+            refcount = counts.get(blob.path, 0)
+            if blob.refcount != refcount:
+                if refcount == 0:
+                    blob.last_used_at = datetime.utcnow()
+                blob.refcount = refcount
+                repaired += 1
+        return repaired
+
+
+# Columns holding a static-relative upload path; each value holds one reference
+UPLOAD_REFERENCES = [
+    (User, 'profile_picture'),
+    (User, 'custom_bg_image'),
+    (SiteSettings, 'logo_path'),
+    (SiteSettings, 'favicon_path'),
+]
+
+
+def _adjust_blob_refcount(connection, path, delta):
+    """Apply a reference delta to the blob at `path` inside the current flush."""
+    if not path:
+        return
+    blobs = UploadBlob.__table__
+    values = {'refcount': blobs.c.refcount + delta}
+    if delta < 0:
+        values['last_used_at'] = datetime.utcnow()
+    # Paths from before content-addressed storage have no row and are skipped
+    connection.execute(blobs.update().where(blobs.c.path == path).values(values))
+
+
+def _keep_previous_upload(target, value, oldvalue, initiator):
+    """No-op 'set' listener; registering it with active_history does the work."""
+
+
+def _track_upload_references(model, names):
+    """Keep UploadBlob.refcount in step with `names` on `model`, like the article counters."""
+    
+    for name in names:
+        # Load the previous value on assignment, so the flush knows what to release
+        event.listen(getattr(model, name), 'set', _keep_previous_upload, active_history=True)
+    
+    @event.listens_for(model, 'after_insert')
+    def _inserted(mapper, connection, target):
+        for name in names:
+            _adjust_blob_refcount(connection, getattr(target, name), 1)
+    
+    @event.listens_for(model, 'after_delete')
+    def _deleted(mapper, connection, target):
+        for name in names:
+            _adjust_blob_refcount(connection, getattr(target, name), -1)
+    
+    @event.listens_for(model, 'after_update')
+    def _updated(mapper, connection, target):
+        state = db.inspect(target)
+        for name in names:
+            history = state.attrs[name].history
+            if not history.has_changes():
+                continue
+            for path in history.deleted:
+                _adjust_blob_refcount(connection, path, -1)
+            for path in history.added:
+                _adjust_blob_refcount(connection, path, 1)
+
+
+for _model in (User, SiteSettings):
+    _track_upload_references(_model, [name for model, name in UPLOAD_REFERENCES if model is _model])
+
+
+# Minimal page data needed to draw a navigation link
+NavLink = namedtuple('NavLink', ['title', 'slug'])
+
+# Process-wide nav link cache, tied to the site settings version
+_nav_cache = {'links': None, 'version': None}
+_nav_cache_lock = threading.Lock()
+
+
 class CustomPage(db.Model):
     """Model for custom pages that can be created by admin."""
     __tablename__ = 'custom_pages'
@@ -258,6 +662,11 @@ class CustomPage(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Navigation links: published pages shown in the nav
+    __table_args__ = (
+        db.Index('ix_custom_pages_is_published_show_in_nav', 'is_published', 'show_in_nav'),
+    )
+    
     def __repr__(self):
         return f'<CustomPage {self.slug}>'
     
@@ -275,12 +684,43 @@ class CustomPage(db.Model):
         }
     
     @staticmethod
-    def generate_slug(title):
-        """Generate URL-friendly slug from title."""
-        import re
+    def nav_links():
+        """
+        Get (title, slug) links for published pages marked show_in_nav.
+        
+        Cached per process and rebuilt when the site settings version
+        changes, which admin page edits bump so every worker notices.
+        """
+        version = SiteSettings.get_cached().version
+        with _nav_cache_lock:
+            if _nav_cache['links'] is not None and _nav_cache['version'] == version:
+                return _nav_cache['links']
+        
+        rows = db.session.execute(
+            select(CustomPage.title, CustomPage.slug)
+            .where(CustomPage.is_published.is_(True), CustomPage.show_in_nav.is_(True))
+            .order_by(CustomPage.id)
+        ).all()
+        links = tuple(NavLink(title, slug) for title, slug in rows)
+        
+        with _nav_cache_lock:
+            _nav_cache['links'] = links
+            _nav_cache['version'] = version
+        return links
+    
+    @staticmethod
+    def invalidate_nav_cache():
+        """Drop this process's cached nav links."""
+        with _nav_cache_lock:
+            _nav_cache['links'] = None
+            _nav_cache['version'] = None
+    
+    @staticmethod
+    def generate_slug(title, exclude_id=None):
+        """Generate a unique URL-friendly slug from title."""
         # Convert to lowercase and replace spaces/special chars with hyphens
-        slug = title.lower().strip()
+        slug = (title or '').lower().strip()
         slug = re.sub(r'[^\w\s-]', '', slug)  # Remove special chars except spaces and hyphens
         slug = re.sub(r'[\s_-]+', '-', slug)  # Replace spaces/underscores with hyphens
         slug = slug.strip('-')  # Remove leading/trailing hyphens
-        return slug
+        return _allocate_slug(CustomPage, slug or 'page', exclude_id)
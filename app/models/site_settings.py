@@ -1,10 +1,20 @@
 """Site settings model for admin customization."""
+from collections import namedtuple
 from datetime import datetime
+import threading
+import time
+
+# Seconds between version checks when serving the cached settings snapshot
+DEFAULT_CHECK_INTERVAL = 5.0
 
 
 def init_site_settings(db):
     """Initialize the SiteSettings model with database instance."""
     
+    # Process-wide snapshot cache shared by every request thread
+    _cache = {'snapshot': None, 'checked_at': 0.0}
+    _cache_lock = threading.Lock()
+    
     class SiteSettings(db.Model):
         """Model for storing site-wide customization settings."""
         __tablename__ = 'site_settings'
@@ -39,6 +49,9 @@ def init_site_settings(db):
         secondary_color = db.Column(db.String(20), default='#8b5cf6')
         logo_path = db.Column(db.String(255))
         favicon_path = db.Column(db.String(255))
+        # Resized copies of the logo and favicon, see app.utils.images
+        logo_variants = db.Column(db.JSON)
+        favicon_variants = db.Column(db.JSON)
         
         # Features Toggle
         enable_comments = db.Column(db.Boolean, default=True)
@@ -50,9 +63,68 @@ def init_site_settings(db):
         created_at = db.Column(db.DateTime, default=datetime.utcnow)
         updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
         
+        # Bumped on every save so cached snapshots in other workers go stale
+        version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+        
         def __repr__(self):
             return f'<SiteSettings {self.site_name}>'
         
+        def to_snapshot(self):
+            """Return an immutable, session-independent copy of these settings."""
+            return SiteSettingsSnapshot(*(getattr(self, name) for name in SiteSettingsSnapshot._fields))
+        
+        def bump_version(self):
+            """Mark settings as changed; call before committing an update."""
+            self.version = (self.version or 0) + 1
+        
+        @staticmethod
+        def invalidate_cache():
+            """Force the next get_cached() call in this process to reload."""
+            with _cache_lock:
+                _cache['snapshot'] = None
+                _cache['checked_at'] = 0.0
+        
+        @staticmethod
+        def get_cached():
+            """
+            Get a cached, read-only snapshot of the site settings.
+            
+            The stored version is re-checked at most once every
+            SITE_SETTINGS_CHECK_INTERVAL seconds; the full row is only
+            reloaded when the version has changed.
+            """
+            from flask import current_app
+            interval = current_app.config.get('SITE_SETTINGS_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+            
+            snapshot = _cache['snapshot']
+            if snapshot is not None and time.monotonic() - _cache['checked_at'] < interval:
+                return snapshot
+            
+            # Only one thread refreshes; the others keep serving the old snapshot
+            if not _cache_lock.acquire(blocking=snapshot is None):
+                return snapshot
+            try:
+                snapshot = _cache['snapshot']
+                if snapshot is not None and time.monotonic() - _cache['checked_at'] < interval:
+                    return snapshot
+                
+                try:
+                    version = db.session.execute(db.select(SiteSettings.version).limit(1)).scalar()
+                except Exception:
+                    db.session.rollback()
+                    version = None
+                if snapshot is None or version is None or version != snapshot.version:
+                    settings = SiteSettings.get_settings()
+                    snapshot = settings.to_snapshot()
+                    if settings.id is None:
+                        # Database unavailable; serve defaults without caching them
+                        return snapshot
+                    _cache['snapshot'] = snapshot
+                _cache['checked_at'] = time.monotonic()
+                return snapshot
+            finally:
+                _cache_lock.release()
+        
         @staticmethod
         def get_settings():
             """Get or create site settings."""
@@ -103,4 +175,9 @@ def init_site_settings(db):
                     enable_social_sharing=True
                 )
     
+    SiteSettingsSnapshot = namedtuple(
+        'SiteSettingsSnapshot',
+        [column.key for column in SiteSettings.__table__.columns],
+    )
+    
     return SiteSettings
@@ -1,18 +1,27 @@
 """Admin routes for managing articles and dashboard."""
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, abort
-from werkzeug.utils import secure_filename
-from app.models import db, Article, User, Newsletter, Comment, Like, SiteSettings, CustomPage
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, abort, jsonify
+from app.models import db, Article, User, Newsletter, Comment, Like, SiteSettings, CustomPage, add_with_unique_slug
 from app.forms import ArticleForm
+from app.utils.markdown_renderer import markdown_cache
+from app.core.uploads import discard_upload, schedule_garbage_collection, store_image
+from app.core.admin_articles import STATUSES as ARTICLE_STATUSES, admin_articles_page
+from app.core.user_stats import SORTS as USER_STATS_SORTS, user_stats_page
+from app.core.response_cache import response_cache
+from app.core.tasks import email_executor_stats
+from app.core.outbox import outbox_stats
+from app.utils.pagination import decode_cursor
 from datetime import datetime
-import os
-from pathlib import Path
+from sqlalchemy import select
 
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'svg', 'ico'}
 
+USERS_PER_PAGE = 50
+DASHBOARD_ARTICLES_PER_PAGE = 50
+
 
 def require_login():
     """Check if user is logged in and is admin."""
@@ -52,17 +61,60 @@ def require_writer_or_admin():
     return None
 
 
+def commit_page_change():
+    """Commit a custom page change and drop cached navigation links."""
+    # Bumping the settings version makes other workers rebuild their nav too
+    SiteSettings.get_settings().bump_version()
+    db.session.commit()
+    SiteSettings.invalidate_cache()
+    CustomPage.invalidate_nav_cache()
+
+
 @admin_bp.route('/')
 def dashboard():
-    """Admin dashboard - show all articles."""
+    """Admin dashboard - one page of articles (published and drafts) and the custom pages."""
+    redirect_response = require_login()
+    if redirect_response:
+        return redirect_response
+    
+    status = request.args.get('status', '')
+    filters = {
+        'status': status if status in ARTICLE_STATUSES else '',
+        'author': request.args.get('author', '').strip(),
+        'title': request.args.get('title', '').strip(),
+    }
+    pagination = admin_articles_page(
+        status=filters['status'],
+        author=filters['author'],
+        title_prefix=filters['title'],
+        per_page=DASHBOARD_ARTICLES_PER_PAGE,
+        after=decode_cursor(request.args.get('after')),
+        before=decode_cursor(request.args.get('before')),
+    )
+    # Only what the pages table shows; content is never loaded
+    pages = db.session.execute(
+        select(CustomPage.title, CustomPage.slug, CustomPage.is_published)
+        .order_by(CustomPage.created_at.desc())
+    ).all()
+    # Carried into the pagination links; empty filters are left out of the URL
+    filter_args = {key: value for key, value in filters.items() if value}
+    return render_template('admin/admin.jinja', articles=pagination.items, pagination=pagination,
+                           filters=filters, filter_args=filter_args, pages=pages)
+
+
+@admin_bp.route('/metrics')
+def metrics():
+    """Expose per-process cache and worker counters as JSON for monitoring."""
     redirect_response = require_login()
     if redirect_response:
         return redirect_response
     
-    # Show list of all articles (published and unpublished) for management
-    all_articles = [article.to_dict() for article in Article.query.order_by(Article.created_at.desc()).all()]
-    all_pages = CustomPage.query.order_by(CustomPage.created_at.desc()).all()
-    return render_template('admin/admin.jinja', articles=all_articles, pages=all_pages)
+    return jsonify({
+        'markdown_cache': markdown_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'email_executor': email_executor_stats(),
+        'email_outbox': outbox_stats(),
+    })
 
 
 @admin_bp.route('/article/new', methods=['GET', 'POST'])
@@ -80,16 +132,15 @@ def new_article():
         content = form.content.data
         published = 1 if form.published.data else 0
         
-        slug = Article.generate_slug(title)
         article = Article(
-            slug=slug, 
             title=title, 
             summary=summary, 
             content=content, 
             published=published,
             author_id=session.get('user_id')  # Track who created it
         )
-        db.session.add(article)
+        article.render_content()
+        add_with_unique_slug(article, title)
         db.session.commit()
         
         # Send newsletter in background thread if article is published (works without Redis/Celery!)
@@ -141,7 +192,7 @@ def edit_article(slug):
         article.content = form.content.data
         article.published = 1 if form.published.data else 0
         article.updated_at = datetime.utcnow()
-
+        article.render_content()
         
         db.session.commit()
         flash(f'Article "{article.title}" updated successfully!', 'success')
@@ -227,21 +278,22 @@ def users():
     if redirect_response:
         return redirect_response
     
-    all_users = User.query.order_by(User.created_at.desc()).all()
+    sort = request.args.get('sort', 'created_at')
+    if sort not in USER_STATS_SORTS:
+        sort = 'created_at'
+    direction = 'asc' if request.args.get('dir') == 'asc' else 'desc'
+    
+    # Counts come from grouped subqueries: two statements per page at any size
+    pagination = user_stats_page(
+        page=request.args.get('page', 1, type=int),
+        per_page=USERS_PER_PAGE,
+        sort=sort,
+        direction=direction,
+    )
     current_user_id = session.get('user_id')
     
-    # Get activity stats for each user
-    users_with_stats = []
-    for user in all_users:
-        stats = {
-            'user': user,
-            'articles_count': len(user.articles),
-            'comments_count': Comment.query.filter_by(user_id=user.id).count(),
-            'likes_count': Like.query.filter_by(user_id=user.id).count(),
-        }
-        users_with_stats.append(stats)
-    
-    return render_template('admin/users.jinja', users=users_with_stats, current_user_id=current_user_id)
+    return render_template('admin/users.jinja', users=pagination.items, pagination=pagination,
+                           sort=sort, direction=direction, current_user_id=current_user_id)
 
 
 @admin_bp.route('/users/<int:user_id>/toggle-admin', methods=['POST'])
@@ -408,23 +460,11 @@ def customize_site():
                     flash('Invalid file type for logo. Allowed types are: png, jpg, jpeg, gif, svg, ico.', 'error')
                     return redirect(url_for('admin.customize_site'))
 
-                filename = secure_filename(logo.filename)
-                timestamp = os.urandom(8).hex()
-                file_ext = os.path.splitext(filename)[1]
-                unique_filename = f'logo_{timestamp}{file_ext}'
-                
-                upload_folder = Path('app/static/uploads/site')
-                upload_folder.mkdir(parents=True, exist_ok=True)
-                filepath = upload_folder / unique_filename
-                logo.save(filepath)
-                
-                # Delete old logo
-                if settings.logo_path:
-                    old_path = Path('app/static') / settings.logo_path.lstrip('/')
-                    if old_path.exists():
-                        old_path.unlink()
-                
-                settings.logo_path = f'uploads/site/{unique_filename}'
+                # Stored by content hash; the old logo is collected once unreferenced
+                blob = store_image(logo, 'site', 'logo')
+                discard_upload(settings.logo_path, settings.logo_variants)
+                settings.logo_path = blob.path
+                settings.logo_variants = blob.variants
         
         # Handle favicon upload
         if 'favicon' in request.files:
@@ -434,25 +474,16 @@ def customize_site():
                     flash('Invalid file type for favicon. Allowed types are: png, jpg, jpeg, gif, svg, ico.', 'error')
                     return redirect(url_for('admin.customize_site'))
 
-                filename = secure_filename(favicon.filename)
-                timestamp = os.urandom(8).hex()
-                file_ext = os.path.splitext(filename)[1]
-                unique_filename = f'favicon_{timestamp}{file_ext}'
-                
-                upload_folder = Path('app/static/uploads/site')
-                upload_folder.mkdir(parents=True, exist_ok=True)
-                filepath = upload_folder / unique_filename
-                favicon.save(filepath)
-                
-                # Delete old favicon
-                if settings.favicon_path:
-                    old_path = Path('app/static') / settings.favicon_path.lstrip('/')
-                    if old_path.exists():
-                        old_path.unlink()
-                
-                settings.favicon_path = f'uploads/site/{unique_filename}'
+                # Stored by content hash; the old favicon is collected once unreferenced
+                blob = store_image(favicon, 'site', 'favicon')
+                discard_upload(settings.favicon_path, settings.favicon_variants)
+                settings.favicon_path = blob.path
+                settings.favicon_variants = blob.variants
         
+        settings.bump_version()
         db.session.commit()
+        SiteSettings.invalidate_cache()
+        schedule_garbage_collection()
         flash('Site settings saved successfully!', 'success')
         return redirect(url_for('admin.customize_site'))
     
@@ -478,10 +509,7 @@ def new_page():
             flash('Page title is required.', 'error')
             return redirect(url_for('admin.new_page'))
         
-        # Generate slug from title if not provided
-        if not slug:
-            slug = CustomPage.generate_slug(title)
-        else:
+        if slug:
             # Check for duplicate slug
             existing = CustomPage.query.filter_by(slug=slug).first()
             if existing:
@@ -495,8 +523,12 @@ def new_page():
             is_published=is_published,
             show_in_nav=show_in_nav
         )
-        db.session.add(page)
-        db.session.commit()
+        if slug:
+            db.session.add(page)
+        else:
+            # Generate a unique slug from title if not provided
+            add_with_unique_slug(page, title)
+        commit_page_change()
         
         flash(f'Page "{title}" created successfully!', 'success')
         return redirect(url_for('admin.dashboard'))
@@ -541,7 +573,7 @@ def edit_page(slug):
         page.show_in_nav = show_in_nav
         page.updated_at = datetime.utcnow()
         
-        db.session.commit()
+        commit_page_change()
         flash(f'Page "{title}" updated successfully!', 'success')
         return redirect(url_for('admin.dashboard'))
     
@@ -562,7 +594,7 @@ def delete_page(slug):
     
     title = page.title
     db.session.delete(page)
-    db.session.commit()
+    commit_page_change()
     
     flash(f'Page "{title}" deleted successfully!', 'success')
     return redirect(url_for('admin.dashboard'))
@@ -581,7 +613,7 @@ def toggle_page_published(slug):
         return redirect(url_for('admin.dashboard'))
     
     page.is_published = not page.is_published
-    db.session.commit()
+    commit_page_change()
     
     status = 'published' if page.is_published else 'unpublished'
     flash(f'Page "{page.title}" is now {status}.', 'success')
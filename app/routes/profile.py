@@ -1,11 +1,10 @@
 """Profile management routes."""
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from werkzeug.utils import secure_filename
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
 from app.models import db, User
 from app.forms import ProfileForm, PageCustomizationForm
-from app.utils import extract_colors_from_image
-import os
+from app.core.image_processing import INCOMING_FOLDER, STATUS_PENDING, submit_background_image
+from app.core.uploads import discard_upload, schedule_garbage_collection, store_image, store_upload
 from pathlib import Path
 
 profile_bp = Blueprint('profile', __name__, url_prefix='/profile')
@@ -85,13 +84,14 @@ def edit_profile():
         if 'profile_picture' in request.files:
             file = request.files['profile_picture']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(f"{user.username}_{file.filename}")
-                upload_folder = Path(__file__).resolve().parent.parent / 'static' / 'uploads' / 'profiles'
-                upload_folder.mkdir(parents=True, exist_ok=True)
-                file.save(upload_folder / filename)
-                user.profile_picture = f"uploads/profiles/{filename}"
+                # Stored by content hash; the old picture is collected once unreferenced
+                blob = store_image(file, 'profiles', 'avatar')
+                discard_upload(user.profile_picture, user.profile_picture_variants)
+                user.profile_picture = blob.path
+                user.profile_picture_variants = blob.variants
         
         db.session.commit()
+        schedule_garbage_collection()
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('profile.view_profile'))
     
@@ -135,46 +135,26 @@ def customize_page():
     form = PageCustomizationForm()
     
     if form.validate_on_submit():
+        uploaded_bg_path = None
+        
         # Handle background image upload
         if 'bg_image' in request.files:
             bg_image = request.files['bg_image']
             if bg_image and bg_image.filename:
-                filename = secure_filename(bg_image.filename)
-                # Create unique filename with timestamp
-                timestamp = os.urandom(8).hex()
-                file_ext = os.path.splitext(filename)[1]
-                unique_filename = f'bg_{user.username}_{timestamp}{file_ext}'
-                
-                # Save to static/uploads/backgrounds/
-                upload_folder = Path('app/static/uploads/backgrounds')
-                upload_folder.mkdir(parents=True, exist_ok=True)
-                filepath = upload_folder / unique_filename
-                bg_image.save(filepath)
+                # Kept under static/uploads/incoming/ until its capped copy
+                # is stored under static/uploads/backgrounds/
+                blob = store_upload(bg_image, INCOMING_FOLDER)
                 
-                # Extract colors from the image
-                try:
-                    colors = extract_colors_from_image(str(filepath))
-                    user.custom_bg_color = colors['bg_color']
-                    user.custom_text_color = colors['text_color']
-                    user.custom_accent_color = colors['accent_color']
-                    
-                    # Update form data to show extracted colors
-                    form.custom_bg_color.data = colors['bg_color']
-                    form.custom_text_color.data = colors['text_color']
-                    form.custom_accent_color.data = colors['accent_color']
-                    
-                    flash('Background image uploaded! Colors automatically extracted. You can still adjust them below.', 'success')
-                except Exception as e:
-                    flash(f'Image uploaded but color extraction failed: {str(e)}. Using default colors.', 'warning')
+                # Resizing and color extraction happen off-request once the response has gone out
+                uploaded_bg_path = str(Path(current_app.static_folder) / blob.path)
                 
-                # Delete old background image if exists
-                if user.custom_bg_image:
-                    old_path = Path('app/static') / user.custom_bg_image.lstrip('/')
-                    if old_path.exists():
-                        old_path.unlink()
+                # Files from before content-addressed storage are deleted right away
+                discard_upload(user.custom_bg_image, user.custom_bg_variants)
                 
                 # Save relative path for URL generation
-                user.custom_bg_image = f'uploads/backgrounds/{unique_filename}'
+                user.custom_bg_image = blob.path
+                user.custom_bg_variants = blob.variants
+                user.bg_processing_status = STATUS_PENDING
         
         # Save color preferences (either extracted or manually set)
         user.custom_bg_color = form.custom_bg_color.data or '#0a0e27'
@@ -184,6 +164,14 @@ def customize_page():
         user.custom_font_family = form.custom_font_family.data or 'system-ui'
         
         db.session.commit()
+        schedule_garbage_collection()
+        
+        if uploaded_bg_path:
+            submit_background_image(user.id, uploaded_bg_path, user.custom_bg_image, user.custom_bg_variants)
+            flash('Page customization saved! Colors are being extracted from your background image '
+                  'and will be applied automatically.', 'success')
+            return redirect(url_for('profile.customize_page'))
+        
         flash('Page customization saved successfully!', 'success')
         return redirect(url_for('profile.view_profile'))
     
@@ -195,4 +183,24 @@ def customize_page():
         form.custom_font_size.data = user.custom_font_size or '16px'
         form.custom_font_family.data = user.custom_font_family or 'system-ui'
     
-    return render_template('profile/customize.jinja', form=form, user=user.to_dict())
\ No newline at end of file
+    return render_template('profile/customize.jinja', form=form, user=user.to_dict())
+
+
+@profile_bp.route('/customize/status')
+def customize_status():
+    """Report background image processing progress for the customize page to poll."""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Login required'}), 401
+    
+    user = db.session.get(User, session.get('user_id'))
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify({
+        'status': user.bg_processing_status,
+        'colors': {
+            'bg_color': user.custom_bg_color,
+            'text_color': user.custom_text_color,
+            'accent_color': user.custom_accent_color,
+        },
+    })
\ No newline at end of file
@@ -1,26 +1,57 @@
 """Public routes for viewing articles and pages."""
 
-from flask import Blueprint, render_template, request, jsonify, flash, url_for, redirect, session, abort
-from app.models import db, Article, Newsletter, Comment, Like, CustomPage, SiteSettings
+from flask import Blueprint, render_template, request, jsonify, flash, url_for, redirect, session, abort, make_response
+from app.models import db, Article, Newsletter, Comment, Like, CustomPage, SiteSettings, add_with_unique_slug
 from app.forms import NewsletterForm
+from app.core.response_cache import tag_response
+from app.utils.http_cache import make_etag, not_modified_response, set_validators
+from app.utils.pagination import keyset_paginate, decode_cursor, encode_cursor
 import logging
 
 logger = logging.getLogger(__name__)
 
 public_bp = Blueprint('public', __name__)
 
+ARTICLES_PER_PAGE = 10
+
+
+def _published_articles_page():
+    """Fetch one keyset page of published articles from the after/before query args."""
+    return keyset_paginate(
+        Article.listing_query().filter_by(published=1),
+        Article.created_at,
+        Article.id,
+        ARTICLES_PER_PAGE,
+        after=decode_cursor(request.args.get('after')),
+        before=decode_cursor(request.args.get('before')),
+    )
+
+
+def _legacy_page_redirect(endpoint, page):
+    """Redirect an old ?page=N URL to the equivalent cursor URL."""
+    if page > 1:
+        # One OFFSET lookup to find the last row of the previous page
+        boundary = (Article.query.with_entities(Article.created_at, Article.id)
+                    .filter_by(published=1)
+                    .order_by(Article.created_at.desc(), Article.id.desc())
+                    .offset((page - 1) * ARTICLES_PER_PAGE - 1)
+                    .first())
+        if boundary:
+            return redirect(url_for(endpoint, after=encode_cursor(*boundary)), code=301)
+    return redirect(url_for(endpoint), code=301)
+
 
 @public_bp.route('/')
 def index():
     """Home page."""
-    settings = SiteSettings.get_settings()
+    settings = SiteSettings.get_cached()
     return render_template('public/welcome_page.jinja', content=settings.welcome_page_content, settings=settings)
 
 
 @public_bp.route('/about/')
 def about():
     """About page."""
-    settings = SiteSettings.get_settings()
+    settings = SiteSettings.get_cached()
     return render_template('public/about_page.jinja', content=settings.about_page_content, settings=settings)
 
 
@@ -43,9 +74,9 @@ def articles():
             error_msg = {'error': 'Title is required'}
             return jsonify(error_msg) if request.is_json else (str(error_msg), 400)
         
-        slug = Article.generate_slug(title)
-        article_obj = Article(slug=slug, title=title, summary=summary, content=content, published=published)
-        db.session.add(article_obj)
+        article_obj = Article(title=title, summary=summary, content=content, published=published)
+        article_obj.render_content()
+        add_with_unique_slug(article_obj, title)
         db.session.commit()
         
         if request.is_json:
@@ -54,22 +85,53 @@ def articles():
         flash(f'Article "{title}" created successfully!', 'success')
         return redirect(url_for('public.articles'))
 
-    # Pagination for GET requests
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-    pagination = Article.query.filter_by(published=1).order_by(Article.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    all_articles = [a.to_dict() for a in pagination.items]
+    # Old offset-style links still work, but are redirected to cursor URLs
+    page = request.args.get('page', type=int)
+    if page is not None:
+        return _legacy_page_redirect('public.articles', page)
+    
+    pagination = _published_articles_page()
+    all_articles = [a.to_list_dict() for a in pagination.items]
     return render_template('public/articles.jinja', articles=all_articles, pagination=pagination)
 
 
+@public_bp.route('/articles.json')
+def articles_json():
+    """JSON list of published articles with cursor links."""
+    page = request.args.get('page', type=int)
+    if page is not None:
+        return _legacy_page_redirect('public.articles_json', page)
+    
+    pagination = _published_articles_page()
+    return jsonify({
+        'articles': [a.to_list_dict() for a in pagination.items],
+        'next': url_for('public.articles_json', after=pagination.next_cursor, _external=True) if pagination.next_cursor else None,
+        'prev': url_for('public.articles_json', before=pagination.prev_cursor, _external=True) if pagination.prev_cursor else None,
+    })
+
+
 @public_bp.route('/articles/<slug>/')
 def article_detail(slug):
     """View a single article."""
     article_obj = Article.query.filter_by(slug=slug).first()
     if not article_obj:
         return render_template('public/article_not_found.jinja', slug=slug), 404
+    tag_response(f'article:{article_obj.id}')
+    
+    # Answer revalidation requests before loading comments or rendering
+    etag = make_etag(
+        'article', article_obj.id, article_obj.content_hash,
+        article_obj.updated_at or article_obj.created_at,
+        article_obj.likes_count, article_obj.approved_comments_count,
+        article_obj.profiles_updated_at(),
+        SiteSettings.get_cached().version,
+        session.get('user_id'), session.get('is_admin'),
+    )
+    # No Last-Modified: likes, comments and settings change the page
+    # without a timestamp, so only the ETag can tell the copy is current
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
     
     # Get comments for this article
     comments = Comment.query.filter_by(article_id=article_obj.id, approved=True).order_by(Comment.created_at.desc()).all()
@@ -80,10 +142,12 @@ def article_detail(slug):
         user_has_liked = article_obj.is_liked_by(session.get('user_id'))
     
     article = article_obj.to_dict()
+    article['content_html'] = article_obj.get_content_html()
     article['comments'] = [c.to_dict() for c in comments]
     article['user_has_liked'] = user_has_liked
     
-    return render_template('public/article.jinja', article=article, article_obj=article_obj)
+    response = make_response(render_template('public/article.jinja', article=article, article_obj=article_obj))
+    return set_validators(response, etag)
 
 
 @public_bp.route('/newsletter/subscribe', methods=['POST'])
@@ -253,4 +317,15 @@ def view_page(slug):
     if not page.is_published and not session.get('is_admin'):
         abort(404)
     
-    return render_template('public/custom_page.jinja', page=page)
+    etag = make_etag(
+        'page', page.id, page.updated_at, page.is_published,
+        SiteSettings.get_cached().version,
+        session.get('user_id'), session.get('is_admin'),
+    )
+    # ETag only: site settings and the session change the page too
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
+    
+    response = make_response(render_template('public/custom_page.jinja', page=page))
+    return set_validators(response, etag)
@@ -2,5 +2,6 @@
 Utility functions for the application.
 """
 from .color_extractor import extract_colors_from_image
+from .markdown_renderer import render_markdown, content_hash
 
-__all__ = ['extract_colors_from_image']
+__all__ = ['extract_colors_from_image', 'render_markdown', 'content_hash']
@@ -4,7 +4,6 @@ Extracts dominant colors from images and generates suitable text/accent colors.
 """
 from PIL import Image
 import colorsys
-from collections import Counter
 
 
 def rgb_to_hex(rgb):
@@ -34,13 +33,45 @@ def get_complementary_color(rgb):
     return (int(r * 255), int(g * 255), int(b * 255))
 
 
+# Longest edge (px) images are reduced to before palette analysis
+ANALYSIS_SIZE = 128
+
+
+def load_analysis_image(image_path, size=ANALYSIS_SIZE):
+    """
+    Open an image reduced to fit within size x size pixels, in RGB.
+    
+    JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale via draft mode, so
+    a large photo is never fully decoded into memory.
+    """
+    with Image.open(image_path) as img:
+        img.draft('RGB', (size, size))
+        img = img.convert('RGB')
+    img.thumbnail((size, size), Image.Resampling.BILINEAR)
+    return img
+
+
+def dominant_color(img, num_colors=5):
+    """
+    Return the representative RGB color of the largest color bucket.
+    
+    Pixels are grouped into `num_colors` buckets with median-cut
+    quantization; each bucket's color is the average of its pixels, which
+    is far less noisy than the most frequent exact RGB value.
+    """
+    quantized = img.quantize(colors=num_colors, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors(num_colors))
+    palette = quantized.getpalette()
+    return tuple(palette[index * 3:index * 3 + 3])
+
+
 def extract_colors_from_image(image_path, num_colors=5):
     """
     Extract dominant colors from an image and return suitable color scheme.
     
     Args:
         image_path: Path to the image file
-        num_colors: Number of dominant colors to analyze
+        num_colors: Number of color buckets to group the image into
     
     Returns:
         dict: {
@@ -49,20 +80,8 @@ def extract_colors_from_image(image_path, num_colors=5):
             'accent_color': hex color for accents/highlights
         }
     """
-    # Open and resize image for faster processing
-    img = Image.open(image_path)
-    img = img.convert('RGB')
-    img = img.resize((150, 150), Image.Resampling.LANCZOS)
-    
-    # Get all pixels
-    pixels = list(img.getdata())
-    
-    # Count color frequencies
-    color_counts = Counter(pixels)
-    dominant_colors = color_counts.most_common(num_colors)
-    
-    # Get the most dominant color for background
-    bg_color = dominant_colors[0][0]
+    img = load_analysis_image(image_path)
+    bg_color = dominant_color(img, num_colors)
     bg_luminance = get_luminance(bg_color)
     
     # Determine text color based on background luminance
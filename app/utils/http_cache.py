@@ -0,0 +1,70 @@
+"""
+HTTP validator helpers for conditional GET requests (ETag / Last-Modified).
+"""
+from datetime import timezone
+import hashlib
+
+from flask import request, session, current_app, g
+
+
+def make_etag(*parts):
+    """Build an ETag value from the pieces of state a page depends on."""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _as_utc(value):
+    """Treat naive database timestamps as UTC and drop sub-second precision."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def _can_use_validators():
+    # Pages rendering flashed messages must never be answered with a 304.
+    # Rendering consumes the flashes, so the answer is remembered per request.
+    if 'http_validators_allowed' not in g:
+        g.http_validators_allowed = '_flashes' not in session
+    return g.http_validators_allowed
+
+
+def not_modified_response(etag, last_modified=None):
+    """
+    Return a 304 response if the client's copy is still current, else None.
+
+    Call this before doing any expensive work for the page. If-None-Match
+    takes precedence over If-Modified-Since, as required by RFC 9110.
+
+    Only pass `last_modified` if it changes whenever any part of the ETag
+    does; otherwise a client sending only If-Modified-Since gets a stale 304.
+    """
+    if request.method not in ('GET', 'HEAD') or not _can_use_validators():
+        return None
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        fresh = _as_utc(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    response = current_app.response_class(status=304)
+    return set_validators(response, etag, last_modified)
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified headers so clients can revalidate cheaply."""
+    if not _can_use_validators():
+        return response
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    # Always revalidate; logged-in pages must not sit in shared caches
+    response.cache_control.no_cache = True
+    if session.get('logged_in'):
+        response.cache_control.private = True
+    return response
@@ -0,0 +1,219 @@
+"""
+Resized derivatives of uploaded images.
+
+Uploads are capped in dimensions and stripped of EXIF before they are
+stored under their hash (see app.core.uploads), then smaller WebP copies
+(with a JPEG, or PNG for transparent images, fallback) are written next to
+the original. The list of derivatives is stored on the model so
+templates can serve the smallest file that fits instead of the original.
+"""
+from collections import namedtuple
+import logging
+import math
+import os
+from pathlib import Path
+import posixpath
+import tempfile
+
+from flask import url_for
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Longest edge (px) an original upload is shrunk to
+DEFAULT_MAX_DIMENSION = 2560
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# mode: 'square' crops to size x size, 'width'/'height' scale that edge to size
+# fallback: format of the non-WebP copy; None picks JPEG, or PNG for transparent images
+DerivativeSpec = namedtuple('DerivativeSpec', ['mode', 'sizes', 'fallback'])
+
+DERIVATIVE_SPECS = {
+    # 24/32/100/150px avatars in the templates, at 2x
+    'avatar': DerivativeSpec('square', (48, 64, 200, 300), None),
+    # srcset widths for profile backgrounds
+    'background': DerivativeSpec('width', (640, 1280, 1920), None),
+    'logo': DerivativeSpec('height', (50, 100), None),
+    'favicon': DerivativeSpec('square', (32, 180), 'PNG'),
+}
+
+_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def _has_alpha(img):
+    return img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+
+
+def _save_options(fmt, icc_profile=None):
+    """Encoder settings per format; EXIF is never passed on, so it is dropped."""
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+    if fmt == 'WEBP':
+        options.update(quality=WEBP_QUALITY, method=4)
+    elif fmt == 'JPEG':
+        options.update(quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'PNG':
+        options.update(optimize=True)
+    return options
+
+
+def cap_original(path, max_dimension=DEFAULT_MAX_DIMENSION):
+    """
+    Shrink an upload in place to fit within max_dimension and drop its EXIF.
+
+    Images already small enough and without EXIF, and animated images, are
+    left untouched. Returns the (width, height) of the stored original.
+    """
+    with Image.open(path) as img:
+        fmt = 'JPEG' if img.format == 'MPO' else img.format
+        if getattr(img, 'is_animated', False) and img.format != 'MPO':
+            return img.size
+        if max(img.size) <= max_dimension and 'exif' not in img.info:
+            return img.size
+
+        icc_profile = img.info.get('icc_profile')
+        img.draft(None, (max_dimension, max_dimension))
+        # Bake the EXIF orientation into the pixels before the tag goes
+        capped = ImageOps.exif_transpose(img)
+    capped.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    # Write beside the original and swap, so a failed save never truncates it;
+    # the temp name is unique, as two processes may cap the same file at once
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.cap-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            capped.save(out, format=fmt, **_save_options(fmt, icc_profile))
+        # mkstemp() creates the file 0600; keep the original's permissions
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return capped.size
+
+
+def _target_size(mode, size, width, height):
+    """Output (width, height) for one derivative, never larger than the source."""
+    if mode == 'square':
+        side = min(size, width, height)
+        return side, side
+    scale = min(1.0, size / (width if mode == 'width' else height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def generate_derivatives(path, stored_path, kind):
+    """
+    Write the resized copies for `kind` next to the upload at `path`.
+
+    Args:
+        path: Filesystem path of the upload, already passed through cap_upload()
+        stored_path: Its path relative to the static folder, as stored on the model
+        kind: Key of DERIVATIVE_SPECS
+
+    Returns:
+        list: One dict per size, smallest first, with width, height and the
+        static-relative paths of the 'webp' copy and its 'fallback'
+    """
+    spec = DERIVATIVE_SPECS[kind]
+    directory = Path(path).parent
+    stem = Path(stored_path).stem
+    stored_dir = posixpath.dirname(stored_path)
+
+    with Image.open(path) as img:
+        width, height = img.size
+        targets = []
+        for size in spec.sizes:
+            target = _target_size(spec.mode, size, width, height)
+            if target not in targets:
+                targets.append(target)
+
+        # Decode JPEGs at the smallest scale that still covers the largest copy
+        largest_w, largest_h = targets[-1]
+        scale = max(largest_w / width, largest_h / height)
+        img.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+
+        icc_profile = img.info.get('icc_profile')
+        alpha = _has_alpha(img)
+        source = img.convert('RGBA' if alpha else 'RGB')
+
+    fallback = spec.fallback or ('PNG' if alpha else 'JPEG')
+    variants = []
+    for target in targets:
+        if spec.mode == 'square':
+            resized = ImageOps.fit(source, target, Image.Resampling.LANCZOS)
+        else:
+            resized = source.resize(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        variant = {'width': target[0], 'height': target[1]}
+        for key, fmt in (('webp', 'WEBP'), ('fallback', fallback)):
+            name = f'{stem}-{target[0]}w.{_EXTENSIONS[fmt]}'
+            image = resized.convert('RGB') if fmt == 'JPEG' and resized.mode != 'RGB' else resized
+            image.save(directory / name, format=fmt, **_save_options(fmt, icc_profile))
+            variant[key] = posixpath.join(stored_dir, name)
+        variants.append(variant)
+    return variants
+
+
+def cap_upload(path, max_dimension=DEFAULT_MAX_DIMENSION):
+    """
+    cap_original() a file that is not stored under its hash yet.
+
+    Files Pillow cannot read (e.g. SVG logos) are left as they are.
+    """
+    try:
+        cap_original(path, max_dimension)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Could not cap upload {path}: {e}")
+
+
+def process_upload(path, stored_path, kind):
+    """
+    Generate the derivatives of an upload capped before it was stored.
+
+    Returns the derivative list, or None if Pillow cannot read the file
+    (e.g. SVG logos); templates then fall back to the original.
+    """
+    try:
+        return generate_derivatives(path, stored_path, kind)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Could not generate {kind} derivatives for {stored_path}: {e}")
+        return None
+
+
+def remove_image(static_folder, stored_path, variants=None):
+    """Delete an upload and its derivatives from the static folder."""
+    paths = [stored_path] if stored_path else []
+    for variant in variants or []:
+        paths.extend((variant['webp'], variant['fallback']))
+    for stored in paths:
+        file_path = Path(static_folder) / stored.lstrip('/')
+        if file_path.exists():
+            file_path.unlink()
+
+
+def pick_variant(variants, width=None, height=None):
+    """Smallest derivative at least width x height, else the largest one."""
+    if not variants:
+        return None
+    for variant in variants:
+        if variant['width'] >= (width or 0) and variant['height'] >= (height or 0):
+            return variant
+    return variants[-1]
+
+
+def image_url(path, variants=None, width=None, height=None, fmt='webp'):
+    """
+    Template helper: URL of the best-fitting derivative of an upload.
+
+    `fmt` is 'webp' or 'fallback'; without derivatives the original is served.
+    """
+    variant = pick_variant(variants, width, height)
+    return url_for('static', filename=variant[fmt] if variant else path)
+
+
+def image_srcset(variants, fmt='webp'):
+    """Template helper: a srcset attribute value listing every derivative by width."""
+    return ', '.join(
+        f"{url_for('static', filename=variant[fmt])} {variant['width']}w"
+        for variant in variants or []
+    )
@@ -0,0 +1,33 @@
+"""
+Lazily evaluated values for template contexts.
+"""
+
+
+class LazyList:
+    """
+    A read-only list whose items are loaded on first use.
+
+    Lets context processors offer data to every template without paying for
+    it on templates that never look at it.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._items = None
+
+    def _load(self):
+        if self._items is None:
+            self._items = list(self._loader())
+        return self._items
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __bool__(self):
+        return bool(self._load())
+
+    def __getitem__(self, index):
+        return self._load()[index]
@@ -0,0 +1,125 @@
+"""
+Markdown rendering helpers shared by the template filter and the Article model.
+
+Rendered output is kept in a process-local LRU cache bounded by size in
+bytes, so the same article is only parsed once per worker process.
+"""
+from collections import OrderedDict
+import hashlib
+import sys
+import threading
+import time
+
+import markdown
+from markupsafe import Markup
+
+# Extensions used everywhere article markdown is rendered
+MARKDOWN_EXTENSIONS = ('fenced_code', 'tables', 'nl2br')
+
+# Default upper bound for the rendered-HTML cache (16 MB)
+DEFAULT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def content_hash(text):
+    """
+    Return a hex digest identifying the rendered output of `text`.
+
+    The extension set is part of the digest, so changing MARKDOWN_EXTENSIONS
+    marks every stored rendering as stale.
+    """
+    digest = hashlib.sha256()
+    digest.update(','.join(MARKDOWN_EXTENSIONS).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update((text or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class MarkdownCache:
+    """Thread-safe LRU cache of rendered markdown, bounded by total bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Markdown converters keep parser state, so each thread gets its own
+        self._local = threading.local()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._render_seconds = 0.0
+
+    def configure(self, max_bytes):
+        """Change the size limit, evicting entries if the cache is now too large."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop all cached renderings (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def _converter(self):
+        converter = getattr(self._local, 'converter', None)
+        if converter is None:
+            converter = markdown.Markdown(extensions=list(MARKDOWN_EXTENSIONS))
+            self._local.converter = converter
+        return converter
+
+    def _evict(self):
+        # Caller must hold the lock
+        while self._entries and self._current_bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._current_bytes -= size
+            self._evictions += 1
+
+    def render(self, text):
+        """Return rendered HTML for `text`, using the cache when possible."""
+        key = (content_hash(text), MARKDOWN_EXTENSIONS)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        # Render outside the lock so slow documents don't block other threads
+        started = time.perf_counter()
+        converter = self._converter()
+        html = converter.reset().convert(text or '')
+        elapsed = time.perf_counter() - started
+        size = sys.getsizeof(html)
+
+        with self._lock:
+            self._render_seconds += elapsed
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (html, size)
+                self._current_bytes += size
+                self._evict()
+        return html
+
+    def stats(self):
+        """Return a snapshot of cache counters for monitoring."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'render_seconds': round(self._render_seconds, 6),
+            }
+
+
+# Process-wide cache used by render_markdown()
+markdown_cache = MarkdownCache()
+
+
+def render_markdown(text):
+    """Convert markdown text to safe HTML markup."""
+    return Markup(markdown_cache.render(text))
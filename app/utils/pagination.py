@@ -0,0 +1,134 @@
+"""
+Pagination helpers.
+
+Public listings use keyset (cursor) pagination: pages are addressed by the
+sort key of a boundary row instead of an OFFSET, so every page costs one
+indexed range scan no matter how deep it is. Admin tables, which can be
+sorted by any column, use numbered pages (OffsetPage).
+"""
+import base64
+import binascii
+from datetime import datetime
+import math
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) sort key as an opaque URL-safe token."""
+    raw = f'{created_at.isoformat()}|{row_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token, returning (created_at, id) or None if invalid."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of keyset-paginated results, newest first."""
+
+    def __init__(self, items, has_next, has_prev):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+
+    @property
+    def next_cursor(self):
+        """Cursor for the page of older rows, or None on the last page."""
+        if not (self.has_next and self.items):
+            return None
+        last = self.items[-1]
+        return encode_cursor(last.created_at, last.id)
+
+    @property
+    def prev_cursor(self):
+        """Cursor for the page of newer rows, or None on the first page."""
+        if not (self.has_prev and self.items):
+            return None
+        first = self.items[0]
+        return encode_cursor(first.created_at, first.id)
+
+
+def keyset_paginate(query, created_col, id_col, per_page, after=None, before=None):
+    """
+    Paginate `query` in (created_at DESC, id DESC) order.
+
+    Args:
+        query: Base query (already filtered)
+        created_col: Timestamp column used as the primary sort key
+        id_col: Primary key column used as the tie-breaker
+        per_page: Page size
+        after: Decoded cursor; return rows older than it
+        before: Decoded cursor; return rows newer than it
+
+    Returns:
+        KeysetPage
+    """
+    key = tuple_(created_col, id_col)
+
+    if before is not None:
+        # Walk forwards from the cursor, then flip back to newest-first
+        rows = (query.filter(key > tuple_(*before))
+                .order_by(created_col.asc(), id_col.asc())
+                .limit(per_page + 1)
+                .all())
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPage(items, has_next=True, has_prev=has_prev)
+
+    if after is not None:
+        query = query.filter(key < tuple_(*after))
+
+    rows = (query.order_by(created_col.desc(), id_col.desc())
+            .limit(per_page + 1)
+            .all())
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], has_next=has_next, has_prev=after is not None)
+
+
+class OffsetPage:
+    """One numbered page of a LIMIT/OFFSET listing."""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @staticmethod
+    def clamp(page, per_page, total):
+        """Return the 1-based page number nearest to `page` that exists."""
+        last = max(1, math.ceil(total / per_page))
+        return min(max(page, 1), last)
+
+    @property
+    def offset(self):
+        return (self.page - 1) * self.per_page
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
@@ -0,0 +1,5 @@
+"""
+Benchmark suite for the blog application.
+
+Run with `python -m benchmarks.run --help`.
+"""
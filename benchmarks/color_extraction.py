@@ -0,0 +1,168 @@
+"""
+Compare dominant-color extraction against the previous implementation.
+
+Usage:
+    python -m benchmarks.color_extraction --width 6000 --height 4000 --output colors.json
+
+Generates large synthetic photos (JPEG and PNG), then reports latency
+percentiles and peak memory for the current extract_colors_from_image()
+and for the legacy full-decode + LANCZOS + Counter approach. Each memory
+measurement runs in a fresh process so Pillow's C allocations show up in
+the peak RSS.
+"""
+
+import argparse
+from collections import Counter
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.utils.color_extractor import extract_colors_from_image, get_complementary_color, get_luminance, rgb_to_hex
+
+
+def legacy_extract_colors_from_image(image_path, num_colors=5):
+    """The implementation extract_colors_from_image() replaced, kept for comparison."""
+    img = Image.open(image_path)
+    img = img.convert('RGB')
+    img = img.resize((150, 150), Image.Resampling.LANCZOS)
+    pixels = list(img.getdata())
+    bg_color = Counter(pixels).most_common(num_colors)[0][0]
+    bg_luminance = get_luminance(bg_color)
+    text_color = (30, 30, 40) if bg_luminance > 0.5 else (226, 232, 240)
+    accent_color = get_complementary_color(bg_color)
+    if abs(get_luminance(accent_color) - bg_luminance) < 0.3:
+        if bg_luminance > 0.5:
+            accent_color = tuple(int(c * 0.6) for c in accent_color)
+        else:
+            accent_color = tuple(min(int(c * 1.4), 255) for c in accent_color)
+    return {
+        'bg_color': rgb_to_hex(bg_color),
+        'text_color': rgb_to_hex(text_color),
+        'accent_color': rgb_to_hex(accent_color),
+    }
+
+
+IMPLEMENTATIONS = {
+    'current': extract_colors_from_image,
+    'legacy': legacy_extract_colors_from_image,
+}
+
+
+def make_photo(path, width, height, seed=0):
+    """Write a noisy, photo-like image: a sky gradient, shapes and sensor noise."""
+    sky = Image.linear_gradient('L').resize((width, height))
+    img = Image.merge('RGB', (
+        sky.point(lambda v: 40 + v // 3),
+        sky.point(lambda v: 90 + v // 3),
+        sky.point(lambda v: 160 + v // 4),
+    ))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, height * 2 // 3, width, height), fill=(70, 110, 50))
+    draw.ellipse((width // 5, height // 6, width // 5 + height // 4, height // 6 + height // 4), fill=(250, 220, 120))
+    noise = Image.effect_noise((width, height), 24 + seed).convert('RGB')
+    img = Image.blend(img, noise, 0.15).filter(ImageFilter.GaussianBlur(1))
+    img.save(path, quality=90) if path.endswith('.jpg') else img.save(path)
+
+
+def _peak_rss_kib():
+    # VmHWM belongs to this process alone; ru_maxrss can carry over the parent's peak
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _peak_rss_worker(name, path, conn):
+    fn = IMPLEMENTATIONS[name]
+    baseline = _peak_rss_kib()
+    fn(path)
+    conn.send((_peak_rss_kib() - baseline) * 1024)
+    conn.close()
+
+
+def peak_rss_bytes(name, path):
+    """Growth in peak RSS while running one extraction in a fresh process."""
+    ctx = multiprocessing.get_context('spawn')
+    parent, child = ctx.Pipe()
+    process = ctx.Process(target=_peak_rss_worker, args=(name, path, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def measure(name, path, iterations):
+    fn = IMPLEMENTATIONS[name]
+    fn(path)  # warm up
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        colors = fn(path)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    fn(path)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'colors': colors,
+        'latency_ms': {
+            'min': round(latencies[0], 2),
+            'p50': round(statistics.median(latencies), 2),
+            'max': round(latencies[-1], 2),
+        },
+        'python_peak_bytes': python_peak,
+        'peak_rss_growth_bytes': peak_rss_bytes(name, path),
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    log = lambda msg: print(f'[bench] {msg}', file=sys.stderr)
+
+    workdir = tempfile.mkdtemp(prefix='blog-bench-colors-')
+    results = {}
+    for ext in ('jpg', 'png'):
+        path = os.path.join(workdir, f'photo.{ext}')
+        log(f'generating {args.width}x{args.height} {ext}')
+        make_photo(path, args.width, args.height)
+        results[ext] = {'file_bytes': os.path.getsize(path)}
+        for name in IMPLEMENTATIONS:
+            log(f'measuring {name} on {ext}')
+            results[ext][name] = measure(name, path, args.iterations)
+        results[ext]['speedup'] = round(results[ext]['legacy']['latency_ms']['p50'] /
+                                        results[ext]['current']['latency_ms']['p50'], 1)
+
+    output = json.dumps({'size': [args.width, args.height], 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Measure newsletter send throughput against a local SMTP sink.
+
+Usage:
+    python -m benchmarks.email_throughput --recipients 50000 --output email.json
+
+Compares the compiled path (templates rendered and MIME encoded once per
+send, see app/core/emails.py) with rendering, url_for() and encoding a
+fresh Message for every recipient, and reports messages per second.
+The compiled path fans out over NEWSLETTER_SMTP_CONNECTIONS connections
+(see app/core/smtp_pool.py); use --sink-latency to mimic a remote server.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.dataset import seed
+from benchmarks.run import create_bench_app
+from benchmarks.smtp_sink import SMTPSink
+
+
+def send_per_recipient(article_id):
+    """Baseline: render, url_for() and encode a full Message per subscriber."""
+    from flask import render_template, url_for
+    from flask_mail import Message
+    from app.core import mail
+    from app.models import db, Article, Newsletter
+
+    article = db.session.get(Article, article_id)
+    context = {
+        'article': article,
+        'article_url': url_for('public.article_detail', slug=article.slug, _external=True),
+        'articles_url': url_for('public.articles', _external=True),
+        'home_url': url_for('public.index', _external=True),
+    }
+    sent = 0
+    with mail.connect() as conn:
+        for email in Newsletter.iter_active_emails():
+            unsubscribe_url = url_for('public.newsletter_unsubscribe', email=email, _external=True)
+            # A rejected recipient counts as failed, as in the pooled path
+            try:
+                conn.send(Message(
+                    subject=f'📝 New Article: {article.title}',
+                    recipients=[email],
+                    body=render_template('email/article_notification.txt.jinja', unsubscribe_url=unsubscribe_url, **context),
+                    html=render_template('email/article_notification.html.jinja', unsubscribe_url=unsubscribe_url, **context),
+                ))
+            except Exception:
+                continue
+            sent += 1
+    return sent
+
+
+def send_compiled(article_id):
+    from app.core.tasks import send_article_notification_sync
+    return send_article_notification_sync(article_id)
+
+
+MODES = {
+    'compiled': send_compiled,
+    'per_recipient': send_per_recipient,
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=50_000, help='subscribers to seed (default 50000)')
+    parser.add_argument('--mode', action='append', choices=sorted(MODES), help='modes to run (default: all)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='NEWSLETTER_CHUNK_SIZE for the run')
+    parser.add_argument('--connections', type=int, default=4, help='NEWSLETTER_SMTP_CONNECTIONS for the run')
+    parser.add_argument('--rate-limit', type=float, default=0, help='NEWSLETTER_RATE_LIMIT for the run (0 = unlimited)')
+    parser.add_argument('--sink-latency', type=float, default=0.0, help='seconds the sink waits per message')
+    parser.add_argument('--sink-fail-every', type=int, default=0, help='sink answers every Nth message with a 451')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    log = lambda msg: print(f'[bench] {msg}', file=sys.stderr)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='blog-bench-email-'), 'bench.db')
+    with SMTPSink(latency=args.sink_latency, fail_every=args.sink_fail_every) as sink:
+        host, port = sink.address
+        app = create_bench_app(
+            db_path,
+            MAIL_SUPPRESS_SEND=False,
+            MAIL_SERVER=host,
+            MAIL_PORT=port,
+            MAIL_USE_TLS=False,
+            MAIL_USE_SSL=False,
+            MAIL_USERNAME='',
+            MAIL_PASSWORD='',
+            MAIL_DEBUG=False,
+        )
+        app.config.update(
+            NEWSLETTER_CHUNK_SIZE=args.chunk_size,
+            NEWSLETTER_SMTP_CONNECTIONS=args.connections,
+            NEWSLETTER_RATE_LIMIT=args.rate_limit,
+            NEWSLETTER_SMTP_RETRY_BACKOFF=0.01,
+        )
+
+        with app.app_context():
+            seed({'users': 1, 'articles': 1, 'likes': 0, 'comments': 0,
+                  'subscribers': args.recipients}, log=log)
+
+        results = {}
+        for mode in args.mode or list(MODES):
+            log(f'sending {args.recipients} messages ({mode})')
+            received_before = sink.messages
+            connections_before = sink.connections
+            rejected_before = sink.rejected
+            with app.test_request_context():
+                started = time.perf_counter()
+                sent = MODES[mode](1)
+                elapsed = time.perf_counter() - started
+            results[mode] = {
+                'sent': sent,
+                'failed': args.recipients - (sent or 0),
+                'received': sink.messages - received_before,
+                'smtp_connections': sink.connections - connections_before,
+                'transient_rejections': sink.rejected - rejected_before,
+                'seconds': round(elapsed, 3),
+                'messages_per_second': round(sent / elapsed, 1) if elapsed else None,
+            }
+
+    if 'compiled' in results and 'per_recipient' in results:
+        results['speedup'] = round(results['compiled']['messages_per_second'] /
+                                   results['per_recipient']['messages_per_second'], 2)
+
+    output = json.dumps({
+        'recipients': args.recipients,
+        'connections': args.connections,
+        'rate_limit': args.rate_limit,
+        'sink_latency': args.sink_latency,
+        'results': results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Check that every query issued by app/routes is served by an index.
+
+Usage:
+    python -m benchmarks.query_plans --articles 5000 --likes 50000
+
+Seeds a database, requests every route (GET pages and form posts, in the
+order listed in requests_to_check()) and runs EXPLAIN QUERY PLAN on each
+distinct statement they send. Routes left out are listed in EXCLUDED.
+It fails (exit status 1) if:
+
+- a large table is scanned without an index, or sorted in a temp b-tree
+  (except for the sorts matched by ALLOWED_SORTS);
+- one of the composite indexes in EXPECTED_INDEXES is missing from the
+  plans of the route it was added for.
+
+Small tables (settings, custom pages) are never reported.
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+from sqlalchemy import event
+
+from benchmarks.dataset import BENCH_PASSWORD, seed
+from benchmarks.run import create_bench_app, logged_in_client
+
+DEFAULT_VOLUMES = {
+    'users': 500,
+    'articles': 5_000,
+    'likes': 50_000,
+    'comments': 20_000,
+    'subscribers': 1_000,
+}
+
+# Tables whose full scans or sorts grow with the data
+LARGE_TABLES = {'articles', 'comments', 'likes', 'users', 'newsletter'}
+
+# Ordering by a computed aggregate (admin users page sorted by a count)
+# cannot come from an index, so its temp b-tree is expected
+ALLOWED_SORTS = (
+    re.compile(r'ORDER BY coalesce\('),
+)
+
+# Route -> indexes its plans must use
+EXPECTED_INDEXES = {
+    'public.article_detail': {'ix_comments_article_id_approved_created_at'},
+    'public.toggle_like': {'sqlite_autoindex_likes_1'},
+    'admin.user_activity': {
+        'ix_articles_author_id_created_at_id',
+        'ix_comments_user_id_created_at',
+        'ix_likes_user_id_created_at',
+    },
+    'admin.dashboard': {'ix_articles_created_at_id_title'},
+    'admin.users': {'ix_users_created_at_id'},
+    'public.index': {'ix_custom_pages_is_published_show_in_nav'},
+}
+
+# Route -> why it is not requested
+EXCLUDED = {
+    'profile.customize_page (with bg_image)': 'the image is processed in a pool process and '
+                                              'applied by a callback after the response, so its '
+                                              'statements cannot be told apart from the next request\'s',
+}
+
+_PLAN_TABLE = re.compile(r'^(SCAN|SEARCH) (\w+)')
+
+
+def _png():
+    """A tiny image upload, as the test client expects it."""
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 64), (6, 182, 212)).save(buf, 'PNG')
+    buf.seek(0)
+    return buf, 'plans.png'
+
+
+def requests_to_check(page_slug, comment_id, spare_user_id):
+    """
+    (route, method, path, data) for every route worth planning.
+
+    Writes come after the pages that read the same rows, and the requests
+    that delete rows or switch sessions come last. `spare_user_id` is a user
+    with no articles or comments, so deleting it succeeds.
+    """
+    article_form = {'title': 'Checking the plan', 'summary': 'Plans', 'content': 'Checking the plan',
+                    'published': 'y'}
+    page_form = {'title': 'About the plans', 'slug': page_slug, 'content': 'Plans', 'is_published': 'y',
+                 'show_in_nav': 'y'}
+    customize_form = {'custom_bg_color': '#101010', 'custom_text_color': '#f0f0f0',
+                      'custom_accent_color': '#22d3ee', 'custom_font_size': '16px',
+                      'custom_font_family': 'system-ui'}
+    return [
+        ('public.index', 'GET', '/', None),
+        ('public.about', 'GET', '/about/', None),
+        ('public.articles', 'GET', '/articles/', None),
+        ('public.articles', 'GET', '/articles/?page=3', None),
+        ('public.articles_json', 'GET', '/articles.json', None),
+        ('public.article_detail', 'GET', '/articles/article-1/', None),
+        ('public.view_page', 'GET', f'/{page_slug}/', None),
+        ('public.newsletter_unsubscribe', 'GET', '/newsletter/unsubscribe?email=plans@example.com', None),
+        ('profile.view_profile', 'GET', '/profile/user2', None),
+        ('profile.edit_profile', 'GET', '/profile/edit', None),
+        ('profile.customize_page', 'GET', '/profile/customize', None),
+        ('profile.customize_status', 'GET', '/profile/customize/status', None),
+        ('admin.dashboard', 'GET', '/admin/', None),
+        ('admin.dashboard', 'GET', '/admin/?status=draft', None),
+        ('admin.dashboard', 'GET', '/admin/?author=user2', None),
+        ('admin.dashboard', 'GET', '/admin/?title=Article%201', None),
+        ('admin.metrics', 'GET', '/admin/metrics', None),
+        ('admin.new_article', 'GET', '/admin/article/new', None),
+        ('admin.edit_article', 'GET', '/admin/article/edit/article-1', None),
+        ('admin.users', 'GET', '/admin/users', None),
+        ('admin.users', 'GET', '/admin/users?sort=comments', None),
+        ('admin.users', 'GET', '/admin/users?sort=username&dir=asc&page=2', None),
+        ('admin.user_activity', 'GET', '/admin/users/2/activity', None),
+        ('admin.newsletter_subscribers', 'GET', '/admin/newsletter/subscribers', None),
+        ('admin.customize_site', 'GET', '/admin/customize-site', None),
+        ('admin.new_page', 'GET', '/admin/pages/new', None),
+        ('admin.edit_page', 'GET', f'/admin/pages/edit/{page_slug}', None),
+        ('auth.change_password', 'GET', '/change-password', None),
+        # Writes
+        ('public.toggle_like', 'POST', '/articles/article-1/like', None),
+        ('public.add_comment', 'POST', '/articles/article-1/comment', {'content': 'Checking the plan'}),
+        ('public.delete_comment', 'POST', f'/articles/article-1/comment/{comment_id}/delete', None),
+        ('public.newsletter_subscribe', 'POST', '/newsletter/subscribe', {'email': 'plans@example.com'}),
+        ('public.articles', 'POST', '/articles/', {'title': 'Checking the plan', 'content': 'Plans'}),
+        ('admin.new_article', 'POST', '/admin/article/new', article_form),
+        ('admin.edit_article', 'POST', '/admin/article/edit/article-1', article_form),
+        ('admin.new_page', 'POST', '/admin/pages/new', {'title': 'More plans', 'content': 'Plans'}),
+        ('admin.edit_page', 'POST', f'/admin/pages/edit/{page_slug}', page_form),
+        ('admin.toggle_page_published', 'POST', f'/admin/pages/toggle/{page_slug}', None),
+        ('admin.customize_site', 'POST', '/admin/customize-site',
+         {'site_name': 'Plans', 'enable_comments': 'y', 'enable_likes': 'y', 'logo': _png()}),
+        ('profile.edit_profile', 'POST', '/profile/edit',
+         {'display_name': 'Plans', 'email': 'user1@example.com', 'profile_picture': _png()}),
+        ('profile.customize_page', 'POST', '/profile/customize', customize_form),
+        ('admin.toggle_admin', 'POST', '/admin/users/3/toggle-admin', None),
+        ('admin.toggle_writer', 'POST', '/admin/users/3/toggle-writer', None),
+        # Deletes, then sessions
+        ('admin.delete_article', 'POST', '/admin/article/delete/article-2', None),
+        ('admin.delete_page', 'POST', f'/admin/pages/delete/{page_slug}', None),
+        ('admin.delete_subscriber', 'POST', '/admin/newsletter/delete/1', None),
+        ('admin.delete_user', 'POST', f'/admin/users/{spare_user_id}/delete', None),
+        ('auth.change_password', 'POST', '/change-password',
+         {'current_password': BENCH_PASSWORD, 'new_password': BENCH_PASSWORD, 'confirm_password': BENCH_PASSWORD}),
+        ('auth.logout', 'GET', '/logout', None),
+        ('auth.register', 'GET', '/register', None),
+        ('auth.register', 'POST', '/register',
+         {'username': 'plans', 'password': BENCH_PASSWORD, 'confirm_password': BENCH_PASSWORD}),
+        ('auth.logout', 'GET', '/logout', None),
+        ('auth.login', 'GET', '/login', None),
+        ('auth.login', 'POST', '/login', {'username': 'user1', 'password': BENCH_PASSWORD}),
+    ]
+
+
+def capture_statements(app, client, requests):
+    """Run the requests, returning {route: [(statement, parameters), ...]}."""
+    from app.models import db
+
+    captured = {}
+    current = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+            current.append((statement, parameters))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', on_execute)
+    try:
+        for route, method, path, data in requests:
+            current.clear()
+            response = client.open(path, method=method, data=data)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{method} {path} returned {response.status_code}')
+            statements = captured.setdefault(route, [])
+            seen = {statement for statement, _ in statements}
+            statements.extend(item for item in current if item[0] not in seen)
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', on_execute)
+    return captured
+
+
+def explain(conn, statement, parameters):
+    """EXPLAIN QUERY PLAN detail lines for one statement."""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ())]
+
+
+def plan_problems(route, statement, plan):
+    """Problems in one statement's plan: unindexed scans and sorts of large tables."""
+    sql = ' '.join(statement.split())
+    problems = []
+    large = False
+    for line in plan:
+        match = _PLAN_TABLE.match(line)
+        if not match or match.group(2) not in LARGE_TABLES:
+            continue
+        large = True
+        if match.group(1) == 'SCAN' and 'INDEX' not in line:
+            problems.append(f'{route}: full scan of {match.group(2)}: {sql[:160]}')
+    if large and not any(pattern.search(sql) for pattern in ALLOWED_SORTS):
+        problems.extend(f'{route}: {line.lower()}: {sql[:160]}' for line in plan if 'TEMP B-TREE' in line)
+    return problems
+
+
+def check_plans(db_path, captured):
+    """Return (report, problems) for the captured statements."""
+    conn = sqlite3.connect(db_path)
+    report = {}
+    problems = []
+    try:
+        for route, statements in captured.items():
+            used = set()
+            entries = []
+            for statement, parameters in statements:
+                plan = explain(conn, statement, parameters)
+                entries.append({'sql': ' '.join(statement.split()), 'plan': plan})
+                used.update(index for line in plan for index in re.findall(r'INDEX (\w+)', line))
+                problems.extend(plan_problems(route, statement, plan))
+            for index in sorted(EXPECTED_INDEXES.get(route, set()) - used):
+                problems.append(f'{route}: expected index {index} is not used')
+            report[route] = {'indexes': sorted(used), 'statements': entries}
+    finally:
+        conn.close()
+    return report, problems
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f'--{name}', type=int, default=default, help=f'rows to seed (default {default})')
+    parser.add_argument('--output', help='write every statement and its plan here as JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    log = lambda msg: print(f'[plans] {msg}', file=sys.stderr)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='blog-plans-'), 'plans.db')
+    app = create_bench_app(db_path)
+
+    from app.models import db, Comment, CustomPage, User
+    with app.app_context():
+        counts = seed({name: getattr(args, name) for name in DEFAULT_VOLUMES}, log=log)
+        page = CustomPage(title='About the plans', slug='about-the-plans', content='Plans', show_in_nav=True)
+        spare_user = User(username='plans-spare')
+        spare_user.set_password(BENCH_PASSWORD)
+        db.session.add_all([page, spare_user])
+        db.session.commit()
+        page_slug = page.slug
+        spare_user_id = spare_user.id
+        comment_id = db.session.execute(db.select(Comment.id).order_by(Comment.id.desc()).limit(1)).scalar()
+    # Uploads go to a scratch static folder, not the checkout's
+    app.static_folder = tempfile.mkdtemp(prefix='blog-plans-static-')
+
+    # User 2 authored articles, liked and commented (see dataset.seed), so
+    # their activity page exercises every per-user index
+    admin = logged_in_client(app, user_id=1, is_admin=True)
+    captured = capture_statements(app, admin, requests_to_check(page_slug, comment_id, spare_user_id))
+    report, problems = check_plans(db_path, captured)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'dataset': counts, 'routes': report, 'problems': problems}, fh, indent=2)
+            fh.write('\n')
+
+    statements = sum(len(entry['statements']) for entry in report.values())
+    log(f'checked {statements} statements across {len(report)} routes')
+    for route, reason in EXCLUDED.items():
+        log(f'not checked: {route}: {reason}')
+    for problem in problems:
+        print(problem)
+    if problems:
+        return 1
+    print('OK: every query plan uses an index')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Drive the Flask test client against hot endpoints and report JSON results.
+
+Usage:
+    python -m benchmarks.run --articles 10000 --likes 50000 --output bench.json
+
+Each scenario reports latency percentiles (ms), SQL statements per request
+and the peak Python memory allocated while serving one request.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import event
+
+from benchmarks.dataset import DEFAULT_VOLUMES, seed
+
+
+class StatementCounter:
+    """Counts SQL statements sent through an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def create_bench_app(db_path, **config):
+    """Create an app bound to `db_path` with email sending suppressed unless overridden."""
+    from config import cfg
+    cfg.SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+    cfg.MAIL_SUPPRESS_SEND = True
+    for key, value in config.items():
+        setattr(cfg, key, value)
+
+    from app import create_app
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
+
+
+def logged_in_client(app, user_id, is_admin=False):
+    """Test client with a session for `user_id`, skipping password checks."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['user_id'] = user_id
+        sess['username'] = f'user{user_id}'
+        sess['is_admin'] = is_admin
+        sess['can_write_articles'] = is_admin
+        sess['must_change_password'] = False
+    return client
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(fn, iterations, counter):
+    """Run `fn(i)` repeatedly and summarise latency, SQL and memory."""
+    latencies = []
+    statements = []
+    statuses = set()
+
+    for i in range(iterations):
+        counter.reset()
+        started = time.perf_counter()
+        status = fn(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statements.append(counter.count)
+        statuses.add(status)
+
+    # Memory is traced on a separate run so tracing overhead skews no timings
+    tracemalloc.start()
+    fn(iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'statuses': sorted(str(s) for s in statuses),
+        'latency_ms': {
+            'min': round(latencies[0], 3),
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p90': round(percentile(latencies, 90), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'sql_statements': {
+            'min': min(statements),
+            'mean': round(statistics.fmean(statements), 2),
+            'max': max(statements),
+        },
+        'peak_memory_bytes': peak,
+    }
+
+
+def build_scenarios(app, counts, rng):
+    """Map scenario names to callables taking an iteration number."""
+    from app.core.tasks import send_article_notification_sync
+
+    anonymous = app.test_client()
+    reader = logged_in_client(app, user_id=min(2, counts['users']))
+    admin = logged_in_client(app, user_id=1, is_admin=True)
+    # Published articles are every id not divisible by 20 (see dataset.seed)
+    published_ids = [i for i in range(1, counts['articles'] + 1) if i % 20]
+
+    def articles_first_page(i):
+        return anonymous.get('/articles/').status_code
+
+    def articles_deep_page(i):
+        # Legacy offset links redirect to a cursor URL; follow it like a crawler
+        page = rng.randint(2, max(2, len(published_ids) // 10))
+        return anonymous.get(f'/articles/?page={page}', follow_redirects=True).status_code
+
+    def article_detail(i):
+        return anonymous.get(f'/articles/article-{rng.choice(published_ids)}/').status_code
+
+    def toggle_like(i):
+        return reader.post(f'/articles/article-{published_ids[0]}/like').status_code
+
+    def admin_dashboard(i):
+        return admin.get('/admin/').status_code
+
+    def admin_dashboard_filtered(i):
+        # Writers are users 1-100; rotate through each filter on its own
+        filters = (
+            {'status': 'draft'},
+            {'author': f'user{rng.randint(1, min(100, counts["users"]))}'},
+            {'title': f'Article {rng.randint(1, 9)}'},
+        )
+        return admin.get('/admin/', query_string=filters[i % len(filters)]).status_code
+
+    def admin_users(i):
+        return admin.get('/admin/users').status_code
+
+    def newsletter_fanout(i):
+        with app.test_request_context():
+            return send_article_notification_sync(published_ids[0])
+
+    return {
+        'public.articles': articles_first_page,
+        'public.articles.deep': articles_deep_page,
+        'public.article_detail': article_detail,
+        'public.toggle_like': toggle_like,
+        'admin.dashboard': admin_dashboard,
+        'admin.dashboard.filtered': admin_dashboard_filtered,
+        'admin.users': admin_users,
+        'newsletter.fanout': newsletter_fanout,
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f'--{name}', type=int, default=default, help=f'rows to seed (default {default})')
+    parser.add_argument('--iterations', type=int, default=50, help='requests per scenario')
+    parser.add_argument('--heavy-iterations', type=int, default=3,
+                        help='iterations for the admin users page and the newsletter fan-out')
+    parser.add_argument('--scenario', action='append', help='run only these scenarios (repeatable)')
+    parser.add_argument('--db', help='database file to use (default: a temporary file)')
+    parser.add_argument('--reuse', action='store_true', help='skip seeding and reuse --db as-is')
+    parser.add_argument('--seed', type=int, default=1234, help='random seed')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    log = lambda msg: print(f'[bench] {msg}', file=sys.stderr)
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='blog-bench-'), 'bench.db')
+    if not args.reuse and os.path.exists(db_path):
+        os.remove(db_path)
+
+    app = create_bench_app(db_path)
+    counts = {name: getattr(args, name) for name in DEFAULT_VOLUMES}
+
+    from app.models import db
+    with app.app_context():
+        seed_seconds = None
+        if not args.reuse:
+            started = time.perf_counter()
+            counts = seed(counts, rng_seed=args.seed, log=log)
+            seed_seconds = round(time.perf_counter() - started, 3)
+        counter = StatementCounter(db.engine)
+
+    rng = random.Random(args.seed)
+    scenarios = build_scenarios(app, counts, rng)
+    heavy = {'admin.users', 'newsletter.fanout'}
+
+    results = {}
+    for name, fn in scenarios.items():
+        if args.scenario and name not in args.scenario:
+            continue
+        iterations = args.heavy_iterations if name in heavy else args.iterations
+        log(f'running {name} x{iterations}')
+        results[name] = measure(fn, iterations, counter)
+
+    report = {
+        'dataset': counts,
+        'seed_seconds': seed_seconds,
+        'database': db_path,
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'scenarios': results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
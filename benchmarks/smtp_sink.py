@@ -0,0 +1,133 @@
+"""
+Minimal local SMTP server that accepts and discards every message.
+
+Speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for
+smtplib and Flask-Mail, so email throughput can be measured without a real
+mail server. It can add a per-message delay to mimic a remote server and
+answer every Nth message with a transient 451 to exercise retries. Run
+standalone with:
+
+    python -m benchmarks.smtp_sink --port 8025 --latency 0.02
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        sink = self.server.sink
+        sink._connected()
+        self._reply('220 smtp-sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.wfile.write(b'250-smtp-sink\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n')
+            elif command == b'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    size += len(data_line)
+                if sink.latency:
+                    time.sleep(sink.latency)
+                if sink._record(size):
+                    self._reply('250 OK')
+                else:
+                    self._reply('451 Temporary failure, try again')
+            elif command == b'QUIT':
+                self._reply('221 Bye')
+                return
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self._reply('250 OK')
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SMTPSink:
+    """Background SMTP sink counting the messages and bytes it receives."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_every=0):
+        self._server = _ThreadingServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._lock = threading.Lock()
+        self._thread = None
+        self.latency = latency
+        self.fail_every = fail_every
+        self._attempts = 0
+        self.messages = 0
+        self.bytes = 0
+        self.rejected = 0
+        self.connections = 0
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def _record(self, size):
+        """Count a DATA attempt; returns False if it should be rejected with a 451."""
+        with self._lock:
+            self._attempts += 1
+            if self.fail_every and self._attempts % self.fail_every == 0:
+                self.rejected += 1
+                return False
+            self.messages += 1
+            self.bytes += size
+            return True
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a discarding SMTP server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before accepting each message')
+    parser.add_argument('--fail-every', type=int, default=0, help='answer every Nth message with a 451')
+    args = parser.parse_args(argv)
+
+    sink = SMTPSink(args.host, args.port, latency=args.latency, fail_every=args.fail_every)
+    print(f'SMTP sink listening on {args.host}:{args.port} (Ctrl+C to stop)')
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f'Received {sink.messages} message(s), {sink.bytes} bytes')
+        sink._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
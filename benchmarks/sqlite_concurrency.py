@@ -0,0 +1,212 @@
+"""
+Measure concurrent write throughput on one SQLite file, as several
+gunicorn workers would see it.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency --workers 4 --threads 4 --seconds 10
+
+Each worker is a separate process with its own app and connection pool;
+its threads loop over article reads, like toggles and comments (--mix
+writes drops the reads) for --seconds. The run is repeated per profile on
+a fresh database:
+
+- default: SQLite's own defaults (rollback journal, synchronous=FULL),
+  i.e. every SQLITE_* setting disabled
+- tuned: the SQLITE_* settings from config (WAL, synchronous=NORMAL, ...)
+
+Reports requests per second, latency percentiles and failed requests,
+including "database is locked" errors, per profile and operation.
+"""
+
+import argparse
+from collections import Counter
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.run import percentile
+
+# Operation -> share of requests, per --mix
+MIXES = {
+    'mixed': {'read': 0.5, 'like': 0.35, 'comment': 0.15},
+    'writes': {'read': 0.0, 'like': 0.7, 'comment': 0.3},
+}
+OPERATIONS = ('read', 'like', 'comment')
+
+PROFILES = ('default', 'tuned')
+
+
+def profile_config(name):
+    """SQLITE_* overrides for a profile; every setting is spelled out, since
+    create_bench_app() changes the shared config object in place."""
+    from app.core.sqlite_pragmas import PRAGMA_SETTINGS
+    from config.default import Config
+
+    if name == 'default':
+        return {key: None for key in PRAGMA_SETTINGS}
+    return {key: getattr(Config, key, default) for key, (_, default) in PRAGMA_SETTINGS.items()}
+
+
+def _pick(rng, mix):
+    roll = rng.random()
+    for op, share in mix.items():
+        roll -= share
+        if roll < 0:
+            return op
+    return op
+
+
+def _client_loop(client, articles, mix, deadline, seed, records):
+    """One thread: issue requests until the deadline, recording (op, outcome, ms)."""
+    from sqlalchemy.exc import OperationalError
+
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        op = _pick(rng, mix)
+        slug = f'article-{rng.randint(1, articles)}'
+        started = time.perf_counter()
+        try:
+            if op == 'read':
+                status = client.get(f'/articles/{slug}/').status_code
+            elif op == 'like':
+                status = client.post(f'/articles/{slug}/like').status_code
+            else:
+                status = client.post(f'/articles/{slug}/comment', data={'content': 'Concurrent comment'}).status_code
+            outcome = 'ok' if status < 400 else f'http_{status}'
+        except OperationalError as e:
+            outcome = 'locked' if 'locked' in str(e) else 'operational_error'
+        except Exception as e:
+            outcome = type(e).__name__
+        records.append((op, outcome, (time.perf_counter() - started) * 1000))
+
+
+def _worker(db_path, config, worker_id, threads, seconds, mix, counts, barrier, results):
+    """One worker process: its own app and pool, `threads` concurrent clients."""
+    from benchmarks.run import create_bench_app, logged_in_client
+
+    app = create_bench_app(db_path, **config)
+    clients = []
+    for i in range(threads):
+        # Distinct users so like toggles do not all fight over one row
+        user_id = (worker_id * threads + i) % counts['users'] + 1
+        client = logged_in_client(app, user_id)
+        client.get('/articles/article-1/')  # Warm up the pool and caches
+        clients.append(client)
+
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    records = []
+    pool = [threading.Thread(target=_client_loop,
+                             args=(client, counts['articles'], mix, deadline, worker_id * 1000 + i, records))
+            for i, client in enumerate(clients)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(records)
+
+
+def summarize(records, seconds):
+    """Throughput, latency and failures per operation, plus totals."""
+    summary = {}
+    for op in OPERATIONS + ('all',):
+        rows = [r for r in records if op == 'all' or r[0] == op]
+        if not rows:
+            continue
+        ok = sorted(ms for _, outcome, ms in rows if outcome == 'ok')
+        failures = Counter(outcome for _, outcome, _ in rows if outcome != 'ok')
+        summary[op] = {
+            'requests': len(rows),
+            'ok_per_second': round(len(ok) / seconds, 1),
+            'failures': dict(failures),
+            'latency_ms': {
+                'p50': round(percentile(ok, 50), 2) if ok else None,
+                'p95': round(percentile(ok, 95), 2) if ok else None,
+                'p99': round(percentile(ok, 99), 2) if ok else None,
+                'max': round(ok[-1], 2) if ok else None,
+            },
+        }
+    return summary
+
+
+def run_profile(name, config, args, log):
+    """Seed a fresh database and hammer it from args.workers processes."""
+    from benchmarks.dataset import seed
+    from benchmarks.run import create_bench_app
+
+    directory = tempfile.mkdtemp(prefix=f'blog-sqlite-{name}-')
+    db_path = os.path.join(directory, 'bench.db')
+    counts = {'users': args.users, 'articles': args.articles, 'likes': 0, 'comments': 0, 'subscribers': 0}
+    try:
+        app = create_bench_app(db_path, **config)
+        from app.models import db
+        with app.app_context():
+            seed(counts, log=lambda msg: None)
+            db.engine.dispose()
+
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(args.workers)
+        results = context.Queue()
+        workers = [context.Process(target=_worker,
+                                   args=(db_path, config, i, args.threads, args.seconds, MIXES[args.mix],
+                                         counts, barrier, results))
+                   for i in range(args.workers)]
+        log(f'{name}: {args.workers} workers x {args.threads} threads for {args.seconds}s')
+        for process in workers:
+            process.start()
+        records = []
+        for _ in workers:
+            records.extend(results.get())
+        for process in workers:
+            process.join()
+        return summarize(records, args.seconds)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='processes (gunicorn workers)')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent clients per worker')
+    parser.add_argument('--seconds', type=float, default=10, help='duration per profile')
+    parser.add_argument('--users', type=int, default=1_000, help='users to seed')
+    parser.add_argument('--articles', type=int, default=1_000, help='articles to seed')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed', help='request mix (default mixed)')
+    parser.add_argument('--profile', action='append', choices=PROFILES,
+                        help='run only these profiles (repeatable)')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    log = lambda msg: print(f'[bench] {msg}', file=sys.stderr)
+
+    results = {}
+    for name in args.profile or PROFILES:
+        results[name] = run_profile(name, profile_config(name), args, log)
+        totals = results[name]['all']
+        log(f"{name}: {totals['ok_per_second']} ok/s, failures {totals['failures'] or 'none'}")
+
+    output = json.dumps({
+        'workers': args.workers,
+        'threads': args.threads,
+        'seconds': args.seconds,
+        'mix': MIXES[args.mix],
+        'profiles': results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -21,6 +22,19 @@ class Config:
 	# SQLAlchemy configuration
 	SQLALCHEMY_DATABASE_URI = f'sqlite:///{BASE_DIR / "app.db"}'
 	SQLALCHEMY_TRACK_MODIFICATIONS = False
+	# Extra create_engine() arguments as JSON, e.g. '{"pool_size": 10, "pool_recycle": 3600}'
+	SQLALCHEMY_ENGINE_OPTIONS = json.loads(os.environ.get('SQLALCHEMY_ENGINE_OPTIONS', '{}'))
+
+	# Pragmas applied to every SQLite connection (see app/core/sqlite_pragmas.py);
+	# set a mode to '' to keep SQLite's default
+	SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+	SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+	SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+	# Milliseconds a writer waits for the database lock
+	SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+	# Page cache per connection; negative values are KiB
+	SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))
+	SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
 
 	# Simple admin credentials used by the demo login handler.
 	ADMIN_USER = os.environ.get('ADMIN_USER', 'admin')
@@ -37,5 +51,65 @@ class Config:
 	MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', '')
 	MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@yourblog.com')
 
+	# Size limit (bytes) for the per-process rendered markdown cache
+	MARKDOWN_CACHE_MAX_BYTES = int(os.environ.get('MARKDOWN_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+	# How often (seconds) each worker checks whether cached site settings changed
+	SITE_SETTINGS_CHECK_INTERVAL = float(os.environ.get('SITE_SETTINGS_CHECK_INTERVAL', 5))
+
+	# Full-page cache for anonymous visitors (opt-in, per worker process)
+	RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '0') == '1'
+	RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+	RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+	RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+	# Add ?v=<content hash> to static URLs and cache those for STATIC_MAX_AGE seconds (see app/core/static_assets.py)
+	STATIC_FINGERPRINTS_ENABLED = os.environ.get('STATIC_FINGERPRINTS_ENABLED', '1') == '1'
+	STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 31536000))
+
+	# Background email thread pool (see app/core/tasks.py)
+	EMAIL_EXECUTOR_WORKERS = int(os.environ.get('EMAIL_EXECUTOR_WORKERS', 2))
+	EMAIL_EXECUTOR_QUEUE_SIZE = int(os.environ.get('EMAIL_EXECUTOR_QUEUE_SIZE', 100))
+	# When the queue is full: 'block' (wait, then reject), 'reject' or 'caller_runs'
+	EMAIL_EXECUTOR_POLICY = os.environ.get('EMAIL_EXECUTOR_POLICY', 'block')
+	EMAIL_EXECUTOR_BLOCK_TIMEOUT = float(os.environ.get('EMAIL_EXECUTOR_BLOCK_TIMEOUT', 2))
+	EMAIL_EXECUTOR_DRAIN_TIMEOUT = float(os.environ.get('EMAIL_EXECUTOR_DRAIN_TIMEOUT', 25))
+
+	# Processes resizing and extracting colors from uploaded images (see app/core/image_processing.py)
+	IMAGE_PROCESSING_WORKERS = int(os.environ.get('IMAGE_PROCESSING_WORKERS', 2))
+	# Longest edge (px) uploaded originals are shrunk to
+	IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 2560))
+	# Unreferenced uploads are deleted once unused for this long (see app/core/uploads.py)
+	UPLOAD_GC_GRACE_SECONDS = int(os.environ.get('UPLOAD_GC_GRACE_SECONDS', 600))
+	# Minimum seconds between background sweeps started by upload changes
+	UPLOAD_GC_INTERVAL_SECONDS = int(os.environ.get('UPLOAD_GC_INTERVAL_SECONDS', 300))
+
+	# Subscribers fetched per query while sending newsletters
+	NEWSLETTER_CHUNK_SIZE = int(os.environ.get('NEWSLETTER_CHUNK_SIZE', 500))
+	# Newsletter fan-out: concurrent SMTP connections, global messages/second
+	# (0 = unlimited), messages per connection before reconnecting, and retries
+	# of transient failures with exponential backoff starting at RETRY_BACKOFF seconds
+	NEWSLETTER_SMTP_CONNECTIONS = int(os.environ.get('NEWSLETTER_SMTP_CONNECTIONS', 4))
+	NEWSLETTER_RATE_LIMIT = float(os.environ.get('NEWSLETTER_RATE_LIMIT', 0))
+	NEWSLETTER_SMTP_MAX_PER_CONNECTION = int(os.environ.get('NEWSLETTER_SMTP_MAX_PER_CONNECTION', 100))
+	NEWSLETTER_SMTP_RETRIES = int(os.environ.get('NEWSLETTER_SMTP_RETRIES', 3))
+	NEWSLETTER_SMTP_RETRY_BACKOFF = float(os.environ.get('NEWSLETTER_SMTP_RETRY_BACKOFF', 0.5))
+
+	# 'outbox' (default) only records jobs in the email_outbox table for a
+	# separate `flask email-worker` process to send, so a restart never loses
+	# a newsletter half-way; 'executor' sends from the web process instead,
+	# for setups that cannot run a second process (unsent mail is lost on exit)
+	EMAIL_DELIVERY = os.environ.get('EMAIL_DELIVERY', 'outbox')
+	EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+	EMAIL_OUTBOX_POLL_INTERVAL = float(os.environ.get('EMAIL_OUTBOX_POLL_INTERVAL', 5))
+	EMAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS', 300))
+	EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+	# Retry delay doubles from BACKOFF_BASE seconds up to BACKOFF_MAX
+	EMAIL_OUTBOX_BACKOFF_BASE = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_BASE', 30))
+	EMAIL_OUTBOX_BACKOFF_MAX = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_MAX', 3600))
+	EMAIL_OUTBOX_FANOUT_CHUNK_SIZE = int(os.environ.get('EMAIL_OUTBOX_FANOUT_CHUNK_SIZE', 500))
+	# Sent and failed jobs older than this are deleted by the worker (0 = keep forever)
+	EMAIL_OUTBOX_RETENTION_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_DAYS', 30))
+
 
 default_config = Config()
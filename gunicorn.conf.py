@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Leave time for queued background emails to drain on shutdown
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+
+def worker_exit(server, worker):
+    """Drain the background email executor and image pool before the worker process exits."""
+    from app.core.tasks import shutdown_email_executor
+    from app.core.image_processing import shutdown_image_pool
+    from config import cfg
+    shutdown_email_executor(timeout=getattr(cfg, 'EMAIL_EXECUTOR_DRAIN_TIMEOUT', 25))
+    shutdown_image_pool()
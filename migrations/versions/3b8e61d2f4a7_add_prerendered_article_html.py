@@ -0,0 +1,40 @@
+"""Add pre-rendered article HTML and content hash
+
+Revision ID: 3b8e61d2f4a7
+Revises: ae7eec2f994b
+Create Date: 2026-10-17 09:12:44.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e61d2f4a7'
+down_revision: Union[str, Sequence[str], None] = 'ae7eec2f994b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add columns with error handling to skip if they already exist.
+    # Existing rows are filled in by `flask backfill-article-html`.
+    columns_to_add = [
+        ('content_html', sa.Column('content_html', sa.Text(), nullable=True)),
+        ('content_hash', sa.Column('content_hash', sa.String(length=64), nullable=True)),
+    ]
+    
+    for col_name, col_def in columns_to_add:
+        try:
+            op.add_column('articles', col_def)
+        except:
+            pass  # Column already exists, skip
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('articles', 'content_hash')
+    op.drop_column('articles', 'content_html')
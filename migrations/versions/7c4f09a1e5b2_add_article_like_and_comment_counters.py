@@ -0,0 +1,51 @@
+"""Add denormalized like and approved comment counters to articles
+
+Revision ID: 7c4f09a1e5b2
+Revises: 3b8e61d2f4a7
+Create Date: 2026-10-17 10:03:51.624910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4f09a1e5b2'
+down_revision: Union[str, Sequence[str], None] = '3b8e61d2f4a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add columns with error handling to skip if they already exist
+    columns_to_add = [
+        ('likes_count', sa.Column('likes_count', sa.Integer(), nullable=False, server_default='0')),
+        ('approved_comments_count', sa.Column('approved_comments_count', sa.Integer(), nullable=False, server_default='0')),
+    ]
+    
+    for col_name, col_def in columns_to_add:
+        try:
+            op.add_column('articles', col_def)
+        except:
+            pass  # Column already exists, skip
+    
+    # Populate counters for existing articles
+    op.execute(
+        """
+        UPDATE articles SET
+            likes_count = (SELECT COUNT(*) FROM likes WHERE likes.article_id = articles.id),
+            approved_comments_count = (
+                SELECT COUNT(*) FROM comments
+                WHERE comments.article_id = articles.id AND comments.approved = 1
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('articles', 'approved_comments_count')
+    op.drop_column('articles', 'likes_count')
@@ -0,0 +1,41 @@
+"""Add image derivative columns to users and site_settings
+
+Revision ID: a7c4e1f9b362
+Revises: f3b9d2e6a417
+Create Date: 2026-10-17 15:08:51.227384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c4e1f9b362'
+down_revision: Union[str, Sequence[str], None] = 'f3b9d2e6a417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ('users', 'profile_picture_variants'),
+    ('users', 'custom_bg_variants'),
+    ('site_settings', 'logo_variants'),
+    ('site_settings', 'favicon_variants'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add columns with error handling to skip any that already exist
+    for table, column in COLUMNS:
+        try:
+            op.add_column(table, sa.Column(column, sa.JSON(), nullable=True))
+        except:
+            pass  # Column already exists, skip
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in reversed(COLUMNS):
+        op.drop_column(table, column)
@@ -0,0 +1,47 @@
+"""Add upload_blobs table for content-addressed uploads
+
+Revision ID: b8d5f2a0c473
+Revises: a7c4e1f9b362
+Create Date: 2026-10-17 16:21:07.540392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d5f2a0c473'
+down_revision: Union[str, Sequence[str], None] = 'a7c4e1f9b362'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Create upload_blobs table if it doesn't exist
+    try:
+        op.create_table(
+            'upload_blobs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('path', sa.String(length=255), nullable=False),
+            sa.Column('digest', sa.String(length=64), nullable=False),
+            sa.Column('refcount', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('variants', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('last_used_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('path')
+        )
+        op.create_index('ix_upload_blobs_digest', 'upload_blobs', ['digest'])
+        op.create_index('ix_upload_blobs_refcount_last_used_at', 'upload_blobs', ['refcount', 'last_used_at'])
+    except:
+        pass  # Table already exists
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_upload_blobs_refcount_last_used_at', table_name='upload_blobs')
+    op.drop_index('ix_upload_blobs_digest', table_name='upload_blobs')
+    op.drop_table('upload_blobs')
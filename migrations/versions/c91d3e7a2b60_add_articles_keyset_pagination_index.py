@@ -0,0 +1,36 @@
+"""Add composite index for keyset pagination of published articles
+
+Revision ID: c91d3e7a2b60
+Revises: 7c4f09a1e5b2
+Create Date: 2026-10-17 10:41:27.309512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c91d3e7a2b60'
+down_revision: Union[str, Sequence[str], None] = '7c4f09a1e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    try:
+        op.create_index(
+            'ix_articles_published_created_at_id',
+            'articles',
+            ['published', 'created_at', 'id'],
+            unique=False,
+        )
+    except:
+        pass  # Index already exists
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_articles_published_created_at_id', table_name='articles')
@@ -0,0 +1,32 @@
+"""Add version counter to site_settings for cache invalidation
+
+Revision ID: d2a6b8f0c314
+Revises: c91d3e7a2b60
+Create Date: 2026-10-17 11:20:06.871455
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a6b8f0c314'
+down_revision: Union[str, Sequence[str], None] = 'c91d3e7a2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add column with error handling to skip if it already exists
+    try:
+        op.add_column('site_settings', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    except:
+        pass  # Column already exists, skip
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('site_settings', 'version')
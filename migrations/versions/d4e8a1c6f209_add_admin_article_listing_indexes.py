@@ -0,0 +1,46 @@
+"""Add indexes for the admin dashboard article listing
+
+Revision ID: d4e8a1c6f209
+Revises: b8d5f2a0c473
+Create Date: 2026-10-17 16:58:42.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e8a1c6f209'
+down_revision: Union[str, Sequence[str], None] = 'b8d5f2a0c473'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    try:
+        op.create_index(
+            'ix_articles_created_at_id_title',
+            'articles',
+            ['created_at', 'id', 'title'],
+            unique=False,
+        )
+    except:
+        pass  # Index already exists
+    try:
+        op.create_index(
+            'ix_articles_author_id_created_at_id',
+            'articles',
+            ['author_id', 'created_at', 'id'],
+            unique=False,
+        )
+    except:
+        pass  # Index already exists
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_articles_author_id_created_at_id', table_name='articles')
+    op.drop_index('ix_articles_created_at_id_title', table_name='articles')
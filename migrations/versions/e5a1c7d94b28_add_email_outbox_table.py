@@ -0,0 +1,51 @@
+"""Add email_outbox table for durable email delivery
+
+Revision ID: e5a1c7d94b28
+Revises: d2a6b8f0c314
+Create Date: 2026-10-17 12:05:41.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c7d94b28'
+down_revision: Union[str, Sequence[str], None] = 'd2a6b8f0c314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Create email_outbox table if it doesn't exist
+    try:
+        op.create_table(
+            'email_outbox',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=30), nullable=False),
+            sa.Column('recipient', sa.String(length=120), nullable=True),
+            sa.Column('article_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+            sa.Column('locked_until', sa.DateTime(), nullable=True),
+            sa.Column('claimed_by', sa.String(length=100), nullable=True),
+            sa.Column('progress_cursor', sa.Integer(), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('kind', 'article_id', 'recipient', name='uq_email_outbox_kind_article_recipient')
+        )
+        op.create_index('ix_email_outbox_status_next_attempt', 'email_outbox', ['status', 'next_attempt_at'])
+    except:
+        pass  # Table already exists
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_outbox_status_next_attempt', table_name='email_outbox')
+    op.drop_table('email_outbox')
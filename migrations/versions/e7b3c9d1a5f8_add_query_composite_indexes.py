@@ -0,0 +1,43 @@
+"""Add composite indexes for the queries issued by the routes
+
+Revision ID: e7b3c9d1a5f8
+Revises: d4e8a1c6f209
+Create Date: 2026-10-17 17:34:15.802264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3c9d1a5f8'
+down_revision: Union[str, Sequence[str], None] = 'd4e8a1c6f209'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_comments_article_id_approved_created_at', 'comments', ['article_id', 'approved', 'created_at']),
+    ('ix_comments_user_id_created_at', 'comments', ['user_id', 'created_at']),
+    ('ix_likes_user_id_created_at', 'likes', ['user_id', 'created_at']),
+    ('ix_custom_pages_is_published_show_in_nav', 'custom_pages', ['is_published', 'show_in_nav']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_newsletter_subscribed_at', 'newsletter', ['subscribed_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        try:
+            op.create_index(name, table, columns, unique=False)
+        except:
+            pass  # Index already exists
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,32 @@
+"""Add bg_processing_status to users for off-request image processing
+
+Revision ID: f3b9d2e6a417
+Revises: e5a1c7d94b28
+Create Date: 2026-10-17 13:42:18.604913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d2e6a417'
+down_revision: Union[str, Sequence[str], None] = 'e5a1c7d94b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add column with error handling to skip if it already exists
+    try:
+        op.add_column('users', sa.Column('bg_processing_status', sa.String(length=20), nullable=True))
+    except:
+        pass  # Column already exists, skip
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'bg_processing_status')
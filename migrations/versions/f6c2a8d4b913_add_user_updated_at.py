@@ -0,0 +1,32 @@
+"""Add updated_at to users for validators of pages showing them
+
+Revision ID: f6c2a8d4b913
+Revises: e7b3c9d1a5f8
+Create Date: 2026-10-17 18:05:41.227316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c2a8d4b913'
+down_revision: Union[str, Sequence[str], None] = 'e7b3c9d1a5f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add column with error handling to skip if it already exists
+    try:
+        op.add_column('users', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    except:
+        pass  # Column already exists, skip
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'updated_at')